@@ -1,26 +1,50 @@
-import imaplib
+import imaplib2
 import email
 from email.header import decode_header
-import json
+from email.parser import BytesParser
+import orjson
 import os
 import sys
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, timezone
+from zoneinfo import ZoneInfo
 import re
+from html.parser import HTMLParser
 import time
-import requests
+import random
+import asyncio
+import aiohttp
 from caldav import DAVClient
 from icalendar import Calendar, Event
-import pytz
 import html2text
 import logging
 import uuid
 from dotenv import load_dotenv
-from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-import pickle
+from googleapiclient.model import JsonModel
 from difflib import SequenceMatcher
 import hashlib
+import threading
+import signal
+import sqlite3
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left, bisect_right
+from array import array
+from itertools import compress, takewhile
+# Optional C++ string matching; difflib is used when it is not installed
+try:
+    from rapidfuzz import fuzz
+except ImportError:
+    fuzz = None
+# Optional C ISO 8601 parser; datetime.fromisoformat is used when it is not installed
+try:
+    from ciso8601 import parse_datetime
+except ImportError:
+    parse_datetime = None
 
 # Load environment variables from .env file
 load_dotenv()
@@ -36,11 +60,14 @@ CONFIG = {
     'SEARCH_SUBJECT': os.getenv('SEARCH_SUBJECT', 'Meeting Request'),  # Subject pattern to match
     'OPENROUTER_API_KEY': os.getenv('OPENROUTER_API_KEY', 'your-openrouter-key'),
     'OPENROUTER_MODEL': os.getenv('OPENROUTER_MODEL', 'openai/gpt-3.5-turbo'),  # or gpt-4
-    'CHECK_INTERVAL': int(os.getenv('CHECK_INTERVAL', '60')),  # seconds
+    'CHECK_INTERVAL': int(os.getenv('CHECK_INTERVAL', '60')),  # Polling interval in seconds when IDLE is off or unsupported
     'TIMEZONE': os.getenv('TIMEZONE', 'UTC'),  # Your local timezone
     'MARK_AS_PROCESSED': os.getenv('MARK_AS_PROCESSED', 'true').lower() == 'true',
     'MAX_EMAIL_BODY_CHARS': int(os.getenv('MAX_EMAIL_BODY_CHARS', '3000')),
+    'LOG_LEVEL': os.getenv('LOG_LEVEL', 'INFO').upper(),  # DEBUG, INFO, WARNING or ERROR
+    'LOG_FORMAT': os.getenv('LOG_FORMAT', 'text').lower(),  # 'text' or 'json' (one object per line)
     'RETRY_INTERVAL': int(os.getenv('RETRY_INTERVAL', '60')),  # Interval to retry on error
+    'RETRY_MAX_INTERVAL': int(os.getenv('RETRY_MAX_INTERVAL', '900')),  # Cap for the doubling retry interval
     'GOOGLE_CREDENTIALS_FILE': os.getenv('GOOGLE_CREDENTIALS_FILE', './credentials/google_credentials.json'),
     'GOOGLE_TOKEN_FILE': os.getenv('GOOGLE_TOKEN_FILE', './credentials/google_token.json'),
     'GOOGLE_CALENDAR_NAME': os.getenv('GOOGLE_CALENDAR_NAME', 'primary'),
@@ -49,7 +76,23 @@ CONFIG = {
     'EVENT_PREFIX': os.getenv('EVENT_PREFIX', ""),
     'ENABLE_CALDAV': os.getenv('ENABLE_CALDAV', 'true').lower() == 'true',
     'ENABLE_GOOGLE_CALENDAR': os.getenv('ENABLE_GOOGLE_CALENDAR', 'true').lower() == 'true',
+    'RUN_ONCE': os.getenv('RUN_ONCE', 'false').lower() == 'true',  # Process matching emails once and exit
     'SIMILARITY_THRESHOLD': float(os.getenv('SIMILARITY_THRESHOLD', '0.7')),  # 70% similarity threshold
+    'CALDAV_CONCURRENCY': int(os.getenv('CALDAV_CONCURRENCY', '8')),  # Max parallel CalDAV event uploads
+    'AI_CONCURRENCY': int(os.getenv('AI_CONCURRENCY', '4')),  # Max parallel OpenRouter requests
+    'AI_RETRY_ATTEMPTS': int(os.getenv('AI_RETRY_ATTEMPTS', '4')),  # Attempts per email on 429/5xx responses
+    'AI_BATCH_SIZE': int(os.getenv('AI_BATCH_SIZE', '8')),  # Emails parsed per OpenRouter request (1 disables batching)
+    'AI_CACHE': os.getenv('AI_CACHE', 'true').lower() == 'true',  # Reuse AI results for identical emails seen the same day
+    'USE_IDLE': os.getenv('USE_IDLE', 'true').lower() == 'true',  # Wait for pushed mail with IMAP IDLE instead of polling
+    'IDLE_TIMEOUT': int(os.getenv('IDLE_TIMEOUT', '1740')),  # Re-issue IMAP IDLE before the 29 min limit
+    'IMAP_RECONNECT_INTERVAL': int(os.getenv('IMAP_RECONNECT_INTERVAL', '900')),  # Refresh the IMAP session (seconds)
+    'PROCESSED_EMAILS_DB': os.getenv('PROCESSED_EMAILS_DB', './logs/processed_emails.db'),
+    'PROCESSED_EMAILS_FILE': os.getenv('PROCESSED_EMAILS_FILE', './logs/processed_emails.json'),  # Legacy JSON store, imported once
+    'PROCESSED_EMAILS_LIMIT': int(os.getenv('PROCESSED_EMAILS_LIMIT', '10000')),  # Most recent Message-IDs to remember
+    'PROCESSED_EMAILS_MAX_AGE_DAYS': int(os.getenv('PROCESSED_EMAILS_MAX_AGE_DAYS', '30')),  # Forget Message-IDs older than this
+    'AI_PREFILTER': os.getenv('AI_PREFILTER', 'true').lower() == 'true',  # Skip the AI for emails without date hints
+    'AI_SKIP_KNOWN_EVENTS': os.getenv('AI_SKIP_KNOWN_EVENTS', 'false').lower() == 'true',  # Skip the AI when a cached event already matches the subject and a date
+    'HTML_TO_MARKDOWN': os.getenv('HTML_TO_MARKDOWN', 'false').lower() == 'true',  # Use html2text instead of the plain stripper
 }
 
 # Configure stdout to use UTF-8
@@ -57,36 +100,369 @@ if sys.stdout.encoding != 'utf-8':
     import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
+class JSONFormatter(logging.Formatter):
+    """Format log records as single-line JSON objects for log shippers"""
+    def format(self, record):
+        entry = {
+            'ts': record.created,
+            'level': record.levelname,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode()
+
 # Setup logging
 os.makedirs("logs", exist_ok=True)
 logging.basicConfig(
-    level=logging.INFO,
+    level=CONFIG['LOG_LEVEL'],
     format='%(asctime)s - %(levelname)s - %(message)s',
     handlers=[
         logging.FileHandler("./logs/mail2calendar.log", encoding='utf-8'),
         logging.StreamHandler(sys.stdout)
     ]
 )
+if CONFIG['LOG_FORMAT'] == 'json':
+    for handler in logging.getLogger().handlers:
+        handler.setFormatter(JSONFormatter())
 logger = logging.getLogger(__name__)
 
+# Maximum number of requests Google accepts in a single batch HTTP call
+GOOGLE_BATCH_LIMIT = 50
+# Retries (with exponential backoff) for Google API calls failing with 429/5xx
+GOOGLE_API_RETRIES = 3
+
+# Bytes of payload kept per body character before decoding: UTF-8 needs up to 4,
+# HTML gets extra room because markup is dropped during conversion
+PLAIN_BYTES_PER_CHAR = 4
+HTML_BYTES_PER_CHAR = 16
+
+UTC = timezone.utc
+# Fixed-offset tzinfo objects by UTC offset, shared by every parsed date with that offset
+_TZ_CACHE = {timedelta(0): UTC}
+
+# Precompiled patterns used on every AI response and IMAP fetch
+_CODEBLOCK_RE = re.compile(r'```(?:json)?(.*?)```', re.DOTALL)
+_FETCH_UID_RE = re.compile(rb'\bUID (\d+)')
+# Start of one message's FETCH response, and the section named by a BODY[...] item in it
+_FETCH_START_RE = re.compile(rb'^\d+ \(')
+_FETCH_SECTION_RE = re.compile(rb'BODY\[([^\]]*)\]')
+# One token of an IMAP response list: parentheses, quoted string, {n} literal or atom
+_IMAP_TOKEN_RE = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|\{(\d+)\}|([^\s()"{]+))')
+_IMAP_QUOTED_RE = re.compile(rb'\\(.)')
+_BASE64_RE = re.compile(r'base64', re.IGNORECASE)
+# iCalendar scanning for the CalDAV fast path: folded lines, nested components, "NAME;PARAMS:VALUE" lines
+_ICS_FOLD_RE = re.compile(r'\r?\n[ \t]')
+_ICS_NESTED_RE = re.compile(r'^BEGIN:(\w+)$.*?^END:\1$', re.DOTALL | re.MULTILINE)
+_ICS_LINE_RE = re.compile(r'^([A-Za-z-]+)((?:;[^:;"=]+=(?:"[^"]*"|[^:;"]*))*):(.*)$')
+_ICS_ESCAPE_RE = re.compile(r'\\([\\;,nN])')
+_ICS_FIELDS = {'UID': 'uid', 'SUMMARY': 'summary', 'LOCATION': 'location', 'DESCRIPTION': 'description'}
+_ICS_SCANNED = set(_ICS_FIELDS) | {'DTSTART', 'DTEND', 'RRULE', 'RDATE', 'RECURRENCE-ID'}
+# VCALENDAR wrapper around each new VEVENT; the same for every event, so it is never rebuilt
+_ICS_CALENDAR_HEAD = b'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//mail2cal//EN\r\n'
+_ICS_CALENDAR_TAIL = b'END:VCALENDAR\r\n'
+
+# Anything that looks like a date or time; emails without it are not sent to the AI
+_DATE_HINT_RE = re.compile(
+    r'\b(?:mon|tue|wed|thu|fri|sat|sun|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b'
+    r'|\d{1,2}[:/.-]\d{1,2}|\b\d{1,2}\s*[ap]\.?m\b|\b(?:today|tonight|tomorrow|next\s+\w+)\b',
+    re.IGNORECASE
+)
+# Numeric dates for the known-event check: 2024-03-05, or 3/5, 05-03 and 3/5/24 in either day/month order
+_NUMERIC_DATE_RE = re.compile(r'\b(?:(\d{4})-(\d{1,2})-(\d{1,2})|(\d{1,2})[/-](\d{1,2})(?:[/-](\d{4}|\d{2}))?)\b')
+_WORD_RE = re.compile(r'\w+')
+_NON_ASCII_RE = re.compile(r'[^\x00-\x7f]')
+
+# Prompt sent to the AI for every email; {event_prefix} is filled in once at startup
+AI_PROMPT_TEMPLATE = """
+The current date and time is: {current_datetime}
+Parse this email and extract calendar event information. Return ONLY valid JSON with these fields:
+- title (string): Event title/summary. Start the event title with "{event_prefix}".
+- start_date (string): ISO format date/time (YYYY-MM-DDTHH:MM:SS+00:00) in UTC
+- end_date (string): ISO format date/time (YYYY-MM-DDTHH:MM:SS+00:00) in UTC
+- location (string, optional): Event location
+- description (string, optional): Event description, Zoom/Meeting url (if available)
+If dates are relative (like "tomorrow" or "next Friday"), calculate actual dates based on the current date.
+If times are ambiguous (like "3pm"), use context to determine AM/PM.
+If end time is not specified, assume 1 hour duration.
+If no valid event information can be found, return empty JSON {{}}.
+Email Details:
+From: {sender}
+Subject: {subject}
+Body:
+{body}
+Response format MUST be valid JSON:
+{{
+    "title": "...",
+    "start_date": "...",
+    "end_date": "...",
+    "location": "...",
+    "description": "..."
+}}
+"""
+
+# Prompt for several emails in one request; {emails} holds the numbered email blocks
+AI_BATCH_PROMPT_TEMPLATE = """
+The current date and time is: {current_datetime}
+Parse each of the numbered emails below and extract calendar event information from each one separately.
+For every email, return an object with its "index" and these fields:
+- title (string): Event title/summary. Start the event title with "{event_prefix}".
+- start_date (string): ISO format date/time (YYYY-MM-DDTHH:MM:SS+00:00) in UTC
+- end_date (string): ISO format date/time (YYYY-MM-DDTHH:MM:SS+00:00) in UTC
+- location (string, optional): Event location
+- description (string, optional): Event description, Zoom/Meeting url (if available)
+If dates are relative (like "tomorrow" or "next Friday"), calculate actual dates based on the current date.
+If times are ambiguous (like "3pm"), use context to determine AM/PM.
+If end time is not specified, assume 1 hour duration.
+If no valid event information can be found in an email, return only its index for it, like {{"index": 0}}.
+{emails}
+Response format MUST be valid JSON with exactly one entry per email:
+{{
+    "events": [
+        {{"index": 0, "title": "...", "start_date": "...", "end_date": "...", "location": "...", "description": "..."}}
+    ]
+}}
+"""
+
+# One email inside the batched prompt
+AI_BATCH_EMAIL_TEMPLATE = """
+Email {index}:
+From: {sender}
+Subject: {subject}
+Body:
+{body}
+"""
+
+class _HTMLStripper(HTMLParser):
+    """Collect the visible text of an HTML document, keeping link targets"""
+    SKIP_TAGS = {'script', 'style', 'head'}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == 'a' and not self._skip_depth:
+            # Meeting links often only live in the href
+            href = dict(attrs).get('href')
+            if href and href.startswith('http'):
+                self.parts.append(href)
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            data = data.strip()
+            if data:
+                self.parts.append(data)
+
+def _json_unicode_escape(match):
+    """JSON \\u escape for one non-ASCII character, as UTF-16 surrogates if needed"""
+    units = match.group().encode('utf-16-be')
+    return ''.join(f'\\u{units[i]:02x}{units[i + 1]:02x}' for i in range(0, len(units), 2))
+
+class _OrjsonModel(JsonModel):
+    """Google API model that encodes request bodies and decodes response bodies with orjson"""
+
+    def serialize(self, body_value):
+        if isinstance(body_value, dict) and "data" not in body_value and self._data_wrapper:
+            body_value = {"data": body_value}
+        body = orjson.dumps(body_value).decode()
+        # Content-Length is taken from the string length, so non-ASCII text is escaped as json.dumps does
+        return body if body.isascii() else _NON_ASCII_RE.sub(_json_unicode_escape, body)
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return content.decode('utf-8') if isinstance(content, bytes) else content
+        if self._data_wrapper and "data" in body:
+            body = body["data"]
+        return body
+
 class EmailCalendarAutomator:
     def __init__(self):
-        self.timezone = pytz.timezone(CONFIG['TIMEZONE'])
-        self.processed_emails = set()
+        self.timezone = ZoneInfo(CONFIG['TIMEZONE'])
+        # Message-IDs of handled emails, persisted across restarts; the connection is shared by worker threads
+        self._processed_lock = threading.Lock()
+        self._processed_db = self.open_processed_emails()
+        self._processed_pruned_at = time.time()
+        # Shared OpenRouter session and the event loop it is bound to
+        self._loop = None
+        self._ai_session = None
+        # IMAP connection held by run_continuous, whether it is idling, and the stop request flag
+        self._mail = None
+        self._idling = False
+        self._stop = None
+        # Highest inbox UID handled so far, valid for the mailbox's UIDVALIDITY; kept across restarts
+        self._last_uid = int(self.load_state('last_uid') or 0)
+        self._uidvalidity = self.load_state('uidvalidity')
         self.google_service = None
         self.caldav_calendar = None
-        # Track created event UIDs to prevent duplicates
-        self.created_event_uids = set()
-        # Caching for performance
+        # Worker threads for calendar calls that can run side by side
+        self._executor = None
+        # Track created event UIDs to prevent duplicates, including those from earlier runs
+        self.created_event_uids = self.load_created_event_uids()
+        # CalDAV event cache, guarded by its own lock
+        self._caldav_cache_lock = threading.Lock()
         self._caldav_event_cache = None
         self._caldav_cache_time = None
+        # CalDAV sync-collection state and parsed VEVENTs per object URL, for incremental refreshes
+        self._caldav_sync = None
+        self._caldav_events_by_url = {}
+        # Google events from the latest windowed lookup, read by the known-event check
         self._google_event_cache = None
-        self._google_cache_time = None
+        # Start-day indexes over the latest fetched event lists, keyed by source
+        self._event_indexes = {}
+        self._google_calendar_id_cache = {}
+        self._calendar_list_cache = None
+        self._calendar_list_cache_time = None
+        # AI prompt with the static parts resolved; braces in the prefix are escaped for format()
+        event_prefix = CONFIG['EVENT_PREFIX'].replace('{', '{{').replace('}', '}}')
+        self._prompt_template = AI_PROMPT_TEMPLATE.replace('{event_prefix}', event_prefix)
+        self._batch_prompt_template = AI_BATCH_PROMPT_TEMPLATE.replace('{event_prefix}', event_prefix)
+        # SEARCH criteria for new emails, built once; Gmail gets its indexed X-GM-RAW search
+        subject = CONFIG['SEARCH_SUBJECT']
+        gmail_query = 'subject:"%s"' % subject.replace('"', ' ')
+        self._search_criteria = {
+            False: f'UNSEEN SUBJECT {self.imap_quote(subject)}',
+            True: f'UNSEEN X-GM-RAW {self.imap_quote(gmail_query)}',
+        }
+        # Header-only parser for the cheap first look at each email
+        self._header_parser = BytesParser()
+        # Reusable markdown converter for HTML-only emails, when enabled
+        self._html2text = None
+        if CONFIG['HTML_TO_MARKDOWN']:
+            self._html2text = html2text.HTML2Text()
+            self._html2text.ignore_links = False
+            self._html2text.ignore_images = True
+            # No re-wrapping; the AI does not care about line length
+            self._html2text.body_width = 0
+
+    def open_processed_emails(self):
+        """Open the SQLite store of processed Message-IDs, importing the legacy JSON file once"""
+        try:
+            os.makedirs(os.path.dirname(CONFIG['PROCESSED_EMAILS_DB']) or '.', exist_ok=True)
+            db = sqlite3.connect(CONFIG['PROCESSED_EMAILS_DB'], isolation_level=None, check_same_thread=False)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Could not open processed email store, keeping it in memory: %s", e)
+            db = sqlite3.connect(':memory:', isolation_level=None, check_same_thread=False)
+        # WAL makes each insert a cheap append that survives a crash
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS processed (message_id TEXT PRIMARY KEY, processed_at REAL NOT NULL)")
+        db.execute("CREATE INDEX IF NOT EXISTS processed_at_idx ON processed (processed_at)")
+        db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)")
+        db.execute("CREATE TABLE IF NOT EXISTS ai_results (cache_key TEXT PRIMARY KEY, result BLOB NOT NULL, created_at REAL NOT NULL)")
+        db.execute("CREATE TABLE IF NOT EXISTS created_events (uid TEXT PRIMARY KEY, created_at REAL NOT NULL)")
+        if db.execute("SELECT 1 FROM processed LIMIT 1").fetchone() is None:
+            self.import_processed_emails(db)
+        self.prune_processed_emails(db)
+        logger.info("Loaded %s processed email IDs", db.execute("SELECT COUNT(*) FROM processed").fetchone()[0])
+        return db
+
+    def load_state(self, key):
+        """Read a value saved with save_state, or None"""
+        with self._processed_lock:
+            row = self._processed_db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def save_state(self, key, value):
+        """Persist a small value in the state database"""
+        with self._processed_lock:
+            self._processed_db.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+    def load_created_event_uids(self):
+        """Read the UIDs and IDs of events created by earlier runs"""
+        with self._processed_lock:
+            return {row[0] for row in self._processed_db.execute("SELECT uid FROM created_events")}
+
+    def remember_created_event(self, uid):
+        """Track an event created by this automator, in memory and in the state database"""
+        self.created_event_uids.add(uid)
+        with self._processed_lock:
+            self._processed_db.execute(
+                "INSERT OR IGNORE INTO created_events (uid, created_at) VALUES (?, ?)", (uid, time.time())
+            )
+
+    def import_processed_emails(self, db):
+        """Copy Message-IDs from the JSON file used by older versions into the database"""
+        try:
+            with open(CONFIG['PROCESSED_EMAILS_FILE'], 'rb') as f:
+                stored = orjson.loads(f.read())
+            # Older files hold a plain list of IDs; treat those as processed just now
+            if isinstance(stored, list):
+                stored = dict.fromkeys(stored, time.time())
+            with db:
+                db.execute("BEGIN")
+                db.executemany(
+                    "INSERT OR IGNORE INTO processed (message_id, processed_at) VALUES (?, ?)",
+                    list(stored.items())[-CONFIG['PROCESSED_EMAILS_LIMIT']:]
+                )
+            logger.info("Imported %s processed email IDs from %s", len(stored), CONFIG['PROCESSED_EMAILS_FILE'])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Could not import processed email IDs: %s", e)
+
+    def processed_message_ids(self, message_ids):
+        """Return which of the given Message-IDs have already been processed"""
+        message_ids = list(message_ids)
+        found = set()
+        with self._processed_lock:
+            # Chunked to stay under SQLite's bound parameter limit
+            for i in range(0, len(message_ids), 500):
+                chunk = message_ids[i:i + 500]
+                rows = self._processed_db.execute(
+                    f"SELECT message_id FROM processed WHERE message_id IN ({','.join('?' * len(chunk))})", chunk
+                )
+                found.update(row[0] for row in rows)
+        return found
+
+    def mark_processed(self, message_id):
+        """Remember an email as processed, evicting the oldest IDs beyond the limit or age now and then"""
+        now = time.time()
+        with self._processed_lock:
+            self._processed_db.execute(
+                "INSERT OR REPLACE INTO processed (message_id, processed_at) VALUES (?, ?)", (message_id, now)
+            )
+            if now - self._processed_pruned_at >= 3600:
+                self.prune_processed_emails(self._processed_db)
+                self._processed_pruned_at = now
+
+    def prune_processed_emails(self, db):
+        """Drop processed Message-IDs and created event IDs past the configured age, the oldest beyond the limit, and stale AI results"""
+        # AI cache keys include the date, so anything from before yesterday can never be hit again
+        db.execute("DELETE FROM ai_results WHERE created_at < ?", (time.time() - 2 * 86400,))
+        cutoff = time.time() - CONFIG['PROCESSED_EMAILS_MAX_AGE_DAYS'] * 86400
+        db.execute("DELETE FROM processed WHERE processed_at < ?", (cutoff,))
+        db.execute("DELETE FROM created_events WHERE created_at < ?", (cutoff,))
+        db.execute(
+            "DELETE FROM processed WHERE message_id IN "
+            "(SELECT message_id FROM processed ORDER BY processed_at DESC LIMIT -1 OFFSET ?)",
+            (CONFIG['PROCESSED_EMAILS_LIMIT'],)
+        )
 
     def initialize_calendars(self):
         """Initialize CalDAV and Google Calendar connections based on configuration"""
-        # Initialize CalDAV if enabled
-        if CONFIG['ENABLE_CALDAV']:
+        # The two backends share nothing, so they connect at the same time
+        executor = self.get_executor()
+        caldav = executor.submit(self.initialize_caldav)
+        google = executor.submit(self.initialize_google_calendar)
+        caldav.result()
+        google.result()
+
+    def initialize_caldav(self):
+        """Initialize the CalDAV connection if enabled, retrying on failure"""
+        if CONFIG['ENABLE_CALDAV'] and self.caldav_calendar is not None:
+            # Already connected by the startup check
+            logger.info("CalDAV calendar initialized successfully")
+        elif CONFIG['ENABLE_CALDAV']:
             caldav_success = False
             for attempt in range(CONFIG['CALDAV_RETRY_ATTEMPTS']):
                 try:
@@ -95,25 +471,26 @@ class EmailCalendarAutomator:
                     caldav_success = True
                     break
                 except Exception as e:
-                    logger.warning(f"CalDAV connection attempt {attempt + 1}/{CONFIG['CALDAV_RETRY_ATTEMPTS']} failed: {e}")
+                    logger.warning("CalDAV connection attempt %s/%s failed: %s", attempt + 1, CONFIG['CALDAV_RETRY_ATTEMPTS'], e)
                     if attempt < CONFIG['CALDAV_RETRY_ATTEMPTS'] - 1:
-                        logger.info(f"Retrying CalDAV connection in {CONFIG['CALDAV_RETRY_DELAY']} seconds...")
+                        logger.info("Retrying CalDAV connection in %s seconds...", CONFIG['CALDAV_RETRY_DELAY'])
                         time.sleep(CONFIG['CALDAV_RETRY_DELAY'])
                     else:
-                        logger.error(f"All CalDAV connection attempts failed")
+                        logger.error("All CalDAV connection attempts failed")
                         self.caldav_calendar = None
         else:
             logger.info("CalDAV is disabled via ENABLE_CALDAV=false")
             self.caldav_calendar = None
 
-        # Initialize Google Calendar if enabled
+    def initialize_google_calendar(self):
+        """Initialize the Google Calendar connection if enabled"""
         if CONFIG['ENABLE_GOOGLE_CALENDAR']:
             try:
                 self.google_service = self.authenticate_google()
                 self.list_google_calendars(self.google_service)
                 logger.info("Google Calendar initialized successfully")
             except Exception as e:
-                logger.error(f"Failed to initialize Google Calendar: {e}")
+                logger.error("Failed to initialize Google Calendar: %s", e)
                 self.google_service = None
         else:
             logger.info("Google Calendar is disabled via ENABLE_GOOGLE_CALENDAR=false")
@@ -122,17 +499,49 @@ class EmailCalendarAutomator:
     def connect_gmail(self):
         """Connect to Gmail IMAP server"""
         try:
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
+            mail = imaplib2.IMAP4_SSL('imap.gmail.com')
             mail.login(CONFIG['GMAIL_USER'], CONFIG['GMAIL_APP_PASSWORD'])
             logger.info("Connected to Gmail successfully")
+            if CONFIG['USE_IDLE'] and not self.supports_idle(mail):
+                logger.warning("IMAP server does not support IDLE, falling back to polling")
             return mail
-        except imaplib.IMAP4.error as e:
-            logger.error(f"Gmail authentication error: {e}")
+        except imaplib2.IMAP4.error as e:
+            logger.error("Gmail authentication error: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Failed to connect to Gmail: {e}")
+            logger.error("Failed to connect to Gmail: %s", e)
             raise
 
+    def disconnect_gmail(self, mail):
+        """Log out of the Gmail IMAP session"""
+        try:
+            mail.logout()
+        except Exception as e:
+            logger.warning("Error during mail logout: %s", e)
+
+    def supports_idle(self, mail):
+        """Check whether the IMAP server advertised the IDLE capability"""
+        return 'IDLE' in mail.capabilities
+
+    def wait_for_new_mail(self, mail, timeout):
+        """Block in IMAP IDLE until the server pushes new mail or the timeout expires"""
+        # The last search drained its own SELECT replies, so EXISTS or RECENT queued now arrived during
+        # processing, e.g. with the FETCH or STORE replies; handle it right away instead of idling
+        queued = self.drain_untagged_responses(mail)
+        if 'EXISTS' in queued or 'RECENT' in queued:
+            return True
+        mail.idle(timeout=timeout)
+        pushed = self.drain_untagged_responses(mail)
+        return 'EXISTS' in pushed or 'RECENT' in pushed
+
+    def drain_untagged_responses(self, mail):
+        """Empty the connection's untagged response queue, returning the response types it held"""
+        # EXPUNGE, FETCH and other pushes are never read otherwise and would pile up on a long session
+        with mail.commands_lock:
+            pushed = {typ for typ, _ in mail.untagged_responses}
+            del mail.untagged_responses[:]
+        return pushed
+
     def connect_caldav(self):
         """Connect to CalDAV server (Radicale)"""
         try:
@@ -143,112 +552,126 @@ class EmailCalendarAutomator:
             )
             principal = client.principal()
             calendars = principal.calendars()
+            # Index calendars by the display name returned with the listing
+            calendars_by_name = {}
+            unnamed_calendars = []
+            for calendar in calendars:
+                if getattr(calendar, 'name', None):
+                    calendars_by_name.setdefault(str(calendar.name), calendar)
+                else:
+                    unnamed_calendars.append(calendar)
             # Debug: List all available calendars
             logger.debug("Available calendars:")
+            for display_name, calendar in calendars_by_name.items():
+                logger.debug("  - Name: '%s', URL: %s", display_name, calendar.url)
             # Find the specified calendar by display name
-            target_calendar = None
-            for calendar in calendars:
-                try:
-                    # Try to get the display name
-                    display_name = str(calendar.name) if hasattr(calendar, 'name') else ''
-                    if not display_name:
-                        # Fallback method
+            target_calendar = calendars_by_name.get(CONFIG['CALENDAR_NAME'])
+            if not target_calendar:
+                # Fallback method: PROPFIND only the calendars listed without a name
+                for calendar in unnamed_calendars:
+                    try:
                         props = calendar.get_properties(['{DAV:}displayname'])
                         display_name = props.get('{DAV:}displayname', '')
-                    logger.debug(f"  - Name: '{display_name}', URL: {calendar.url}")
-                    if display_name == CONFIG['CALENDAR_NAME']:
-                        target_calendar = calendar
-                        logger.info(f"Found existing calendar: {CONFIG['CALENDAR_NAME']}")
-                        break
-                except Exception as e:
-                    logger.warning(f"Could not get name for calendar {calendar.url}: {e}")
-                    continue
-            if not target_calendar:
-                logger.warning(f"Calendar '{CONFIG['CALENDAR_NAME']}' not found, creating it")
+                        logger.debug("  - Name: '%s', URL: %s", display_name, calendar.url)
+                        if display_name == CONFIG['CALENDAR_NAME']:
+                            target_calendar = calendar
+                            break
+                    except Exception as e:
+                        logger.warning("Could not get name for calendar %s: %s", calendar.url, e)
+                        continue
+            if target_calendar:
+                logger.info("Found existing calendar: %s", CONFIG['CALENDAR_NAME'])
+            else:
+                logger.warning("Calendar '%s' not found, creating it", CONFIG['CALENDAR_NAME'])
                 # Try to create the calendar if not found
                 target_calendar = principal.make_calendar(name=CONFIG['CALENDAR_NAME'])
-                logger.info(f"Created new calendar: {CONFIG['CALENDAR_NAME']}")
+                logger.info("Created new calendar: %s", CONFIG['CALENDAR_NAME'])
             logger.info("Connected to CalDAV successfully")
             return target_calendar
         except Exception as e:
-            logger.error(f"Failed to connect to CalDAV: {e}")
+            logger.error("Failed to connect to CalDAV: %s", e)
             raise
 
+    def decode_part(self, part, max_bytes=None):
+        """Decode the payload of a MIME part to text, keeping at most max_bytes of it"""
+        try:
+            payload = part.get_payload(decode=True)
+            if payload:
+                # Cut before decoding so huge parts never become huge strings
+                if max_bytes is not None:
+                    payload = payload[:max_bytes]
+                charset = part.get_content_charset() or 'utf-8'
+                return payload.decode(charset, errors='replace')
+        except Exception as e:
+            logger.warning("Error decoding email part: %s", e)
+        return ""
+
     def get_email_body(self, msg):
         """Extract plain text body from email message"""
         body = ""
-        html_body = ""
+        max_chars = CONFIG['MAX_EMAIL_BODY_CHARS']
         if msg.is_multipart():
+            html_part = None
             for part in msg.walk():
+                # Skip attachments before their payload gets decoded
+                if "attachment" in str(part.get("Content-Disposition")):
+                    continue
                 content_type = part.get_content_type()
-                content_disposition = str(part.get("Content-Disposition"))
-                if "attachment" not in content_disposition:
-                    try:
-                        payload = part.get_payload(decode=True)
-                        if payload:
-                            charset = part.get_content_charset() or 'utf-8'
-                            decoded_text = payload.decode(charset, errors='replace')
-                            if content_type == "text/plain":
-                                body = decoded_text
-                            elif content_type == "text/html":
-                                html_body = decoded_text
-                    except Exception as e:
-                        logger.warning(f"Error decoding email part: {e}")
+                if content_type == "text/plain":
+                    body = self.decode_part(part, max_chars * PLAIN_BYTES_PER_CHAR)
+                    if body:
+                        break
+                elif content_type == "text/html" and html_part is None:
+                    html_part = part
+            # If we only have HTML, convert it to plain text
+            if not body and html_part is not None:
+                html_body = self.decode_part(html_part, max_chars * HTML_BYTES_PER_CHAR)
+                if html_body:
+                    body = self.html_to_text(html_body)
+        elif msg.get_content_type() == "text/html":
+            # Single-part HTML email; converted rather than handed to the AI as raw markup
+            html_body = self.decode_part(msg, max_chars * HTML_BYTES_PER_CHAR)
+            if html_body:
+                body = self.html_to_text(html_body)
         else:
-            try:
-                payload = msg.get_payload(decode=True)
-                if payload:
-                    charset = msg.get_content_charset() or 'utf-8'
-                    body = payload.decode(charset, errors='replace')
-            except Exception as e:
-                logger.warning(f"Error decoding email body: {e}")
-        # If we only have HTML, convert it to plain text
-        if not body and html_body:
-            converter = html2text.HTML2Text()
-            converter.ignore_links = False
-            converter.ignore_images = True
-            body = converter.handle(html_body)
-        # Limit body size
-        max_chars = CONFIG['MAX_EMAIL_BODY_CHARS']
+            body = self.decode_part(msg, max_chars * PLAIN_BYTES_PER_CHAR)
+        # Limit body size (safety net after the byte-level caps above)
         if len(body) > max_chars:
-            logger.info(f"Truncating email body from {len(body)} to {max_chars} characters")
+            logger.info("Truncating email body from %s to %s characters", len(body), max_chars)
             body = body[:max_chars] + "... [truncated]"
         return body.strip()
 
-    def parse_email_with_ai(self, subject, body, sender=None):
-        """Use OpenRouter (OpenAI-compatible) to parse email content into event details"""
+    def may_have_date_hint(self, subject, headers):
+        """Cheaply rule out emails with no date hints before their MIME tree is parsed"""
+        if _DATE_HINT_RE.search(subject):
+            return True
+        # With headersonly parsing the payload is the undecoded body text
+        raw_body = headers.get_payload()
+        encoded = _BASE64_RE.search(str(headers.get('Content-Transfer-Encoding', '')))
+        # Searched case-insensitively in place rather than lowercasing a copy of the whole body
+        if encoded or not isinstance(raw_body, str) or _BASE64_RE.search(raw_body):
+            # Encoded parts can hide dates, so leave the decision to the decoded body
+            return True
+        return _DATE_HINT_RE.search(raw_body) is not None
+
+    def html_to_text(self, html_body):
+        """Convert an HTML body to the plain text passed to the AI"""
+        if self._html2text is not None:
+            return self._html2text.handle(html_body)
+        stripper = _HTMLStripper()
+        stripper.feed(html_body)
+        stripper.close()
+        return ' '.join(stripper.parts)
+
+    def build_ai_request(self, subject, body, sender=None):
+        """Build the OpenRouter request payload for an email"""
         current_datetime = datetime.now(self.timezone).strftime("%Y-%m-%d %H:%M:%S %Z")
-        prompt = f"""
-        The current date and time is: {current_datetime}
-        Parse this email and extract calendar event information. Return ONLY valid JSON with these fields:
-        - title (string): Event title/summary. Start the event title with "{CONFIG['EVENT_PREFIX']}".
-        - start_date (string): ISO format date/time (YYYY-MM-DDTHH:MM:SS+00:00) in UTC
-        - end_date (string): ISO format date/time (YYYY-MM-DDTHH:MM:SS+00:00) in UTC
-        - location (string, optional): Event location
-        - description (string, optional): Event description, Zoom/Meeting url (if available)
-        If dates are relative (like "tomorrow" or "next Friday"), calculate actual dates based on the current date.
-        If times are ambiguous (like "3pm"), use context to determine AM/PM.
-        If end time is not specified, assume 1 hour duration.
-        If no valid event information can be found, return empty JSON {{}}.
-        Email Details:
-        From: {sender or 'Unknown'}
-        Subject: {subject}
-        Body:
-        {body}
-        Response format MUST be valid JSON:
-        {{
-            "title": "...",
-            "start_date": "...",
-            "end_date": "...",
-            "location": "...",
-            "description": "..."
-        }}
-        """
-        headers = {
-            "Authorization": f"Bearer {CONFIG['OPENROUTER_API_KEY']}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://github.com/email-calendar-automator"  # Replace with your domain
-        }
+        prompt = self._prompt_template.format(
+            current_datetime=current_datetime,
+            sender=sender or 'Unknown',
+            subject=subject,
+            body=body
+        )
         data = {
             "model": CONFIG['OPENROUTER_MODEL'],
             "messages": [
@@ -257,131 +680,482 @@ class EmailCalendarAutomator:
             "temperature": 0.1,
             "max_tokens": 1000
         }
-        try:
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
-            response.raise_for_status()
-            result = response.json()
-            content = result['choices'][0]['message']['content'].strip()
-            # Extract JSON from potential markdown code blocks
-            if "```" in content:
-                # Extract content between code blocks
-                match = re.search(r'```(?:json)?(.*?)```', content, re.DOTALL)
-                if match:
-                    content = match.group(1).strip()
-            # Try to find JSON object in response
-            match = re.search(r'({.*})', content, re.DOTALL)
+        return data
+
+    def build_ai_batch_request(self, emails):
+        """Build one OpenRouter request payload covering several (subject, body, sender) emails"""
+        current_datetime = datetime.now(self.timezone).strftime("%Y-%m-%d %H:%M:%S %Z")
+        blocks = ''.join(
+            AI_BATCH_EMAIL_TEMPLATE.format(index=index, sender=sender or 'Unknown', subject=subject, body=body)
+            for index, (subject, body, sender) in enumerate(emails)
+        )
+        prompt = self._batch_prompt_template.format(current_datetime=current_datetime, emails=blocks)
+        data = {
+            "model": CONFIG['OPENROUTER_MODEL'],
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.1,
+            # Room for one event object per email
+            "max_tokens": max(1000, 400 * len(emails))
+        }
+        return data
+
+    def extract_ai_json(self, content):
+        """Return the JSON object text from a raw AI response"""
+        content = content.strip()
+        # Extract JSON from potential markdown code blocks
+        if "```" in content:
+            # Extract content between code blocks
+            match = _CODEBLOCK_RE.search(content)
             if match:
-                content = match.group(1)
+                content = match.group(1).strip()
+        # Try to find JSON object in response
+        return self.extract_json_object(content)
+
+    def parse_ai_content(self, content):
+        """Extract and validate event details from the raw AI response text"""
+        content = self.extract_ai_json(content)
+        try:
+            return self.validate_ai_event(orjson.loads(content))
+        except orjson.JSONDecodeError as e:
+            logger.error("Failed to parse AI JSON response: %s", e)
+            logger.debug("AI Response: %s", content)
+            return None
+
+    def parse_ai_batch_content(self, content):
+        """Map each email index in a batched AI response to its validated event, or None"""
+        content = self.extract_ai_json(content)
+        try:
+            entries = orjson.loads(content)['events']
+        except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+            logger.error("Failed to parse batched AI JSON response: %s", e)
+            logger.debug("AI Response: %s", content)
+            return {}
+        parsed = {}
+        for entry in entries:
+            if not isinstance(entry, dict) or not isinstance(entry.get('index'), int):
+                continue
+            index = entry.pop('index')
+            event_data = self.validate_ai_event(entry)
+            # Incomplete entries are left out so the email gets its own request
+            if event_data is None and entry:
+                continue
+            parsed[index] = event_data
+        return parsed
+
+    def validate_ai_event(self, event_data):
+        """Check the parsed AI event has the required fields and timezone-aware dates"""
+        # Validate required fields
+        if not all(k in event_data for k in ['title', 'start_date', 'end_date']):
+            if event_data:  # If we got some data but not complete
+                logger.warning("AI response missing required fields: %s", event_data)
+            else:
+                logger.info("No event details found in email")
+            return None
+        # Ensure dates are in ISO format with timezone
+        for date_field in ['start_date', 'end_date']:
+            dt = event_data[date_field]
+            # Add timezone info if missing
+            if not ('+' in dt or 'Z' in dt):
+                event_data[date_field] = f"{dt}+00:00"
+        logger.info("Parsed event: %s from %s to %s", event_data['title'], event_data['start_date'], event_data['end_date'])
+        return event_data
+
+    def extract_json_object(self, content):
+        """Return the first balanced {...} object in the text, or the text unchanged"""
+        start = content.find('{')
+        if start < 0:
+            return content
+        depth = 0
+        in_string = False
+        escaped = False
+        # Single linear pass; braces inside JSON strings are not counted
+        for i in range(start, len(content)):
+            ch = content[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == '\\':
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == '{':
+                depth += 1
+            elif ch == '}':
+                depth -= 1
+                if depth == 0:
+                    return content[start:i + 1]
+        return content
+
+    async def aparse_email_with_ai(self, session, subject, body, sender=None):
+        """Use OpenRouter (OpenAI-compatible) to parse email content into event details"""
+        content = await self.apost_ai_request(session, self.build_ai_request(subject, body, sender))
+        return self.parse_ai_content(content) if content is not None else None
+
+    async def aparse_emails_batch(self, session, emails):
+        """Parse several (subject, body, sender) emails in one OpenRouter request, keyed by index"""
+        # Generating several events takes longer than one
+        content = await self.apost_ai_request(session, self.build_ai_batch_request(emails), timeout=60)
+        return self.parse_ai_batch_content(content) if content is not None else {}
+
+    async def apost_ai_request(self, session, data, timeout=30):
+        """Send a request to OpenRouter, returning the reply text or None on failure"""
+        payload = orjson.dumps(data)
+        attempts = CONFIG['AI_RETRY_ATTEMPTS']
+        for attempt in range(attempts):
             try:
-                event_data = json.loads(content)
-                # Validate required fields
-                if not all(k in event_data for k in ['title', 'start_date', 'end_date']):
-                    if event_data:  # If we got some data but not complete
-                        logger.warning(f"AI response missing required fields: {event_data}")
+                async with session.post(
+                    "https://openrouter.ai/api/v1/chat/completions",
+                    data=payload,
+                    timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    # Rate limits and server errors are worth another try
+                    if (response.status == 429 or response.status >= 500) and attempt < attempts - 1:
+                        delay = self.parse_retry_after(response.headers.get('Retry-After'))
+                        if delay is None:
+                            delay = 2 ** attempt + random.random()
+                        logger.warning("OpenRouter returned %s, retrying in %.1f seconds (attempt %s/%s)", response.status, delay, attempt + 1, attempts)
                     else:
-                        logger.info("No event details found in email")
-                    return None
-                # Ensure dates are in ISO format with timezone
-                for date_field in ['start_date', 'end_date']:
-                    dt = event_data[date_field]
-                    # Add timezone info if missing
-                    if not ('+' in dt or 'Z' in dt):
-                        event_data[date_field] = f"{dt}+00:00"
-                logger.info(f"Parsed event: {event_data['title']} from {event_data['start_date']} to {event_data['end_date']}")
-                return event_data
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse AI JSON response: {e}")
-                logger.debug(f"AI Response: {content}")
+                        response.raise_for_status()
+                        result = orjson.loads(await response.read())
+                        return result['choices'][0]['message']['content']
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error("Failed to call OpenRouter API: %s", e)
+                return None
+            except (orjson.JSONDecodeError, KeyError, IndexError, TypeError) as e:
+                # A 200 reply that is not JSON or carries no choices, e.g. an error object
+                logger.error("Unexpected response from OpenRouter API: %r", e)
                 return None
-        except requests.RequestException as e:
-            logger.error(f"Failed to call OpenRouter API: {e}")
+            await asyncio.sleep(delay)
+
+    def parse_retry_after(self, value):
+        """Return the delay in seconds from a Retry-After header, or None if it is unusable"""
+        try:
+            # Capped so a bad header cannot stall the whole batch
+            return min(max(float(value), 0.0), 60.0)
+        except (TypeError, ValueError):
             return None
 
+    def ai_cache_key(self, subject, body, sender):
+        """Hash everything that shapes the AI answer for an email"""
+        # Today's date is part of the prompt, so relative dates like "tomorrow" stay correct
+        today = datetime.now(self.timezone).date().isoformat()
+        key = '\0'.join((CONFIG['OPENROUTER_MODEL'], today, sender or '', subject or '', body or ''))
+        return hashlib.blake2b(key.encode('utf-8', errors='replace'), digest_size=16).hexdigest()
+
+    def cached_ai_results(self, keys):
+        """Return the stored AI results for the given cache keys, each as a fresh dict"""
+        found = {}
+        with self._processed_lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._processed_db.execute(
+                    f"SELECT cache_key, result FROM ai_results WHERE cache_key IN ({','.join('?' * len(chunk))})", chunk
+                )
+                found.update((key, orjson.loads(result)) for key, result in rows)
+        return found
+
+    def cache_ai_results(self, results):
+        """Store (cache_key, event_data) pairs for emails the AI parsed successfully"""
+        now = time.time()
+        with self._processed_lock:
+            self._processed_db.executemany(
+                "INSERT OR REPLACE INTO ai_results (cache_key, result, created_at) VALUES (?, ?, ?)",
+                [(key, orjson.dumps(event_data), now) for key, event_data in results]
+            )
+
+    async def _ai_batch(self, emails):
+        """Parse a batch of (email_id, subject, body, sender) tuples concurrently"""
+        emails = [(subject, body, sender) for _, subject, body, sender in emails]
+        if not CONFIG['AI_CACHE']:
+            return await self._ai_parse_all(emails)
+        # Resent or forwarded copies of an email already parsed today skip the AI entirely
+        keys = [self.ai_cache_key(*email) for email in emails]
+        results = self.cached_ai_results(keys)
+        # Identical emails within the batch are only sent once
+        misses = []
+        queued = set()
+        for index, key in enumerate(keys):
+            if key not in results and key not in queued:
+                queued.add(key)
+                misses.append(index)
+        if len(misses) < len(emails):
+            logger.info("Skipping the AI for %s cached or repeated emails", len(emails) - len(misses))
+        parsed = await self._ai_parse_all([emails[index] for index in misses])
+        # Stored before the caller turns the dates into datetimes
+        self.cache_ai_results([(keys[index], result) for index, result in zip(misses, parsed) if isinstance(result, dict)])
+        results.update((keys[index], result) for index, result in zip(misses, parsed))
+        # Each email gets its own copy, since the dates are converted in place later
+        return [dict(results[key]) if isinstance(results[key], dict) else results[key] for key in keys]
+
+    async def _ai_parse_all(self, emails):
+        """Send (subject, body, sender) tuples to the AI in batches, returning one result per email"""
+        semaphore = asyncio.Semaphore(CONFIG['AI_CONCURRENCY'])
+
+        async def parse_one(subject, body, sender):
+            async with semaphore:
+                return await self.aparse_email_with_ai(session, subject, body, sender)
+
+        async def parse_group(group):
+            if len(group) == 1:
+                return await asyncio.gather(parse_one(*group[0]), return_exceptions=True)
+            async with semaphore:
+                try:
+                    parsed = await self.aparse_emails_batch(session, group)
+                except Exception as e:
+                    logger.error("Batched AI request failed: %s", e)
+                    parsed = {}
+            # Emails missing from the batched answer fall back to one request each
+            missing = [index for index in range(len(group)) if index not in parsed]
+            if missing:
+                logger.info("Retrying %s of %s emails individually", len(missing), len(group))
+                retried = await asyncio.gather(*[parse_one(*group[index]) for index in missing], return_exceptions=True)
+                parsed.update(zip(missing, retried))
+            return [parsed[index] for index in range(len(group))]
+
+        session = self.get_ai_session()
+        size = max(CONFIG['AI_BATCH_SIZE'], 1)
+        groups = await asyncio.gather(*[parse_group(emails[i:i + size]) for i in range(0, len(emails), size)])
+        return [result for group in groups for result in group]
+
+    async def _create_events(self, event_datas, caldav_events=None, google_events=None):
+        """Create events in CalDAV and Google Calendar concurrently, returning per-event success"""
+        # The event lists already fetched for this batch, if any, are reused for the duplicate checks
+        # Both clients are synchronous, so each calendar gets its own worker thread
+        async def create_caldav():
+            if CONFIG['ENABLE_CALDAV'] and self.caldav_calendar:
+                return await asyncio.to_thread(self.create_calendar_events_bulk, self.caldav_calendar, event_datas, caldav_events)
+            elif CONFIG['ENABLE_CALDAV']:
+                logger.warning("CalDAV calendar not available, skipping CalDAV event creation")
+            else:
+                logger.info("CalDAV is disabled, skipping CalDAV event creation")
+            return [False] * len(event_datas)
+
+        async def create_google():
+            if CONFIG['ENABLE_GOOGLE_CALENDAR'] and self.google_service:
+                return await asyncio.to_thread(self.create_google_events_batch, self.google_service, event_datas, google_events)
+            elif CONFIG['ENABLE_GOOGLE_CALENDAR']:
+                logger.warning("Google Calendar not available, skipping Google event creation")
+            else:
+                logger.info("Google Calendar is disabled, skipping Google event creation")
+            return [False] * len(event_datas)
+
+        caldav_results, google_results = await asyncio.gather(create_caldav(), create_google())
+        return [success_caldav or success_google for success_caldav, success_google in zip(caldav_results, google_results)]
+
+    def get_ai_session(self):
+        """Return the shared OpenRouter session, creating it on first use"""
+        # Kept open across batches so keep-alive reuses the TLS connection
+        if self._ai_session is None or self._ai_session.closed:
+            # Pool sized to the request concurrency so every parallel call reuses a warm connection
+            connector = aiohttp.TCPConnector(limit_per_host=CONFIG['AI_CONCURRENCY'], ttl_dns_cache=300)
+            self._ai_session = aiohttp.ClientSession(connector=connector, headers={
+                "Authorization": f"Bearer {CONFIG['OPENROUTER_API_KEY']}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": "https://github.com/email-calendar-automator"  # Replace with your domain
+            })
+        return self._ai_session
+
+    def run_async(self, coro):
+        """Run a coroutine on the automator's persistent event loop"""
+        # A long-lived loop lets the aiohttp session outlive a single batch
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+
+    def get_executor(self):
+        """Return the shared worker pool for concurrent calendar calls, creating it on first use"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4)
+        return self._executor
+
+    def close(self):
+        """Release the OpenRouter session, worker pool, processed-email store and event loop"""
+        if self._loop is not None:
+            # Tasks left behind by an interrupted run get to clean up (their finally blocks still
+            # write to the processed-email store) before the loop and the store go away
+            leftover = asyncio.all_tasks(self._loop)
+            for task in leftover:
+                task.cancel()
+            if leftover:
+                self._loop.run_until_complete(asyncio.gather(*leftover, return_exceptions=True))
+            if self._ai_session is not None and not self._ai_session.closed:
+                self._loop.run_until_complete(self._ai_session.close())
+            self._loop.run_until_complete(self._loop.shutdown_default_executor())
+            self._loop.close()
+            self._loop = None
+            self._ai_session = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        with self._processed_lock:
+            self._processed_db.close()
+
+    def refresh_all_caches(self, caldav_calendar=None, google_service=None, time_min=None, time_max=None):
+        """Fetch CalDAV and Google events at the same time, returning (caldav_events, google_events)"""
+        executor = self.get_executor()
+        # CalDAV stays a full, incrementally synced copy; the window only bounds the Google query
+        caldav = executor.submit(self.get_caldav_events, caldav_calendar) if caldav_calendar else None
+        google = executor.submit(self.get_google_events, google_service, time_min, time_max) if google_service else None
+        return caldav.result() if caldav else None, google.result() if google else None
+
+    def invalidate_event_caches(self):
+        """Make the next event lookups refetch, e.g. after this run wrote to the calendars"""
+        with self._caldav_cache_lock:
+            self._caldav_cache_time = None
+
     def get_caldav_events(self, calendar):
         """Retrieve all events from CalDAV calendar with caching"""
-        now = time.time()
-        # Use cache if less than 2 minutes old (more frequent updates)
-        if self._caldav_event_cache and self._caldav_cache_time and (now - self._caldav_cache_time) < 120:
-            return self._caldav_event_cache
+        with self._caldav_cache_lock:
+            now = time.monotonic()
+            # Use cache if less than 2 minutes old (more frequent updates)
+            if self._caldav_event_cache and self._caldav_cache_time and (now - self._caldav_cache_time) < 120:
+                return self._caldav_event_cache
         
+            try:
+                if self._caldav_sync is None:
+                    # Take the sync token before the full fetch so nothing changed in between is missed
+                    try:
+                        self._caldav_sync = calendar.objects_by_sync_token(load_objects=False)
+                    except Exception as e:
+                        logger.debug("CalDAV sync-collection unavailable, fetching all events: %s", e)
+                    self._caldav_events_by_url = {}
+                    changed = calendar.events()
+                else:
+                    # Only transfer and reparse objects added, modified or deleted since the last token
+                    changed, deleted = self._caldav_sync.sync()
+                    for obj in deleted:
+                        self._caldav_events_by_url.pop(str(obj.url.canonical()), None)
+                for obj in changed:
+                    self._caldav_events_by_url[str(obj.url.canonical())] = self.parse_caldav_object(obj)
+                # Skip UIDs we've already processed recently
+                parsed_events = [
+                    event
+                    for events in self._caldav_events_by_url.values()
+                    for event in events
+                    if event['uid'] not in self.created_event_uids
+                ]
+                self._caldav_event_cache = parsed_events
+                self._caldav_cache_time = now
+                self._event_indexes['caldav'] = (parsed_events, self.build_event_index(parsed_events))
+                return parsed_events
+            except Exception as e:
+                logger.error("Error retrieving CalDAV events: %s", e)
+                # Start over with a full fetch next time
+                self._caldav_sync = None
+                return []
+
+    def parse_caldav_object(self, obj):
+        """Parse the VEVENTs of one CalDAV calendar object"""
         try:
-            events = calendar.events()
-            parsed_events = []
-            for event in events:
-                try:
-                    ical = Calendar.from_ical(event.data)
-                    for component in ical.walk():
-                        if component.name == "VEVENT":
-                            uid = str(component.get('uid', ''))
-                            # Skip if we've already processed this UID recently
-                            if uid in self.created_event_uids:
-                                continue
-                                
-                            parsed_events.append({
-                                'uid': uid,
-                                'summary': str(component.get('summary', '')),
-                                'start': component.get('dtstart').dt if component.get('dtstart') else None,
-                                'end': component.get('dtend').dt if component.get('dtend') else None,
-                                'location': str(component.get('location', '')),
-                                'description': str(component.get('description', '')),
-                                'raw': component
-                            })
-                except Exception as e:
-                    logger.debug(f"Error parsing CalDAV event: {e}")
-                    continue
-            self._caldav_event_cache = parsed_events
-            self._caldav_cache_time = now
-            return parsed_events
+            # Plain single events are scanned directly; anything unusual goes through icalendar
+            parsed_event = self.scan_ics_event(obj.data)
+            if parsed_event is not None:
+                return [parsed_event]
         except Exception as e:
-            logger.error(f"Error retrieving CalDAV events: {e}")
-            return []
+            logger.debug("Falling back to full iCalendar parse: %s", e)
+        parsed_events = []
+        try:
+            ical = Calendar.from_ical(obj.data)
+            for component in ical.walk():
+                if component.name == "VEVENT":
+                    parsed_events.append({
+                        'uid': str(component.get('uid', '')),
+                        'summary': str(component.get('summary', '')),
+                        'start': component.get('dtstart').dt if component.get('dtstart') else None,
+                        'end': component.get('dtend').dt if component.get('dtend') else None,
+                        'location': str(component.get('location', '')),
+                        'description': str(component.get('description', '')),
+                    })
+        except Exception as e:
+            logger.debug("Error parsing CalDAV event: %s", e)
+        return parsed_events
+
+    def scan_ics_event(self, data):
+        """Read the fields we compare from a single, non-recurring VEVENT, or return None if it is not one"""
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        data = _ICS_FOLD_RE.sub('', data).replace('\r\n', '\n')
+        start = data.find('\nBEGIN:VEVENT\n')
+        end = data.find('\nEND:VEVENT', start)
+        if start < 0 or end < 0 or data.find('\nBEGIN:VEVENT\n', end) >= 0:
+            return None
+        # Alarms and other nested components have DESCRIPTIONs of their own
+        body = _ICS_NESTED_RE.sub('', data[start + len('\nBEGIN:VEVENT\n'):end])
+        event = {'uid': '', 'summary': '', 'start': None, 'end': None, 'location': '', 'description': ''}
+        for line in body.split('\n'):
+            match = _ICS_LINE_RE.match(line)
+            if not match:
+                # Unusual parameter syntax on a field we need is left to icalendar
+                if line.split(':', 1)[0].split(';', 1)[0].upper() in _ICS_SCANNED:
+                    return None
+                continue
+            name, params, value = match.group(1).upper(), match.group(2), match.group(3)
+            if name in ('RRULE', 'RDATE', 'RECURRENCE-ID'):
+                return None
+            if name in _ICS_FIELDS:
+                event[_ICS_FIELDS[name]] = _ICS_ESCAPE_RE.sub(
+                    lambda m: '\n' if m.group(1) in 'nN' else m.group(1), value
+                )
+            elif name in ('DTSTART', 'DTEND'):
+                event['start' if name == 'DTSTART' else 'end'] = self.parse_ics_datetime(params, value)
+        return event
+
+    def parse_ics_datetime(self, params, value):
+        """Convert an iCalendar DATE or DATE-TIME value to a date or datetime"""
+        value = value.strip()
+        if len(value) == 8:
+            return datetime.strptime(value, '%Y%m%d').date()
+        if value.endswith('Z'):
+            return datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=UTC)
+        parsed = datetime.strptime(value, '%Y%m%dT%H%M%S')
+        for param in params.split(';'):
+            if param.upper().startswith('TZID='):
+                # Unknown zone names raise here and send the event to the full parser
+                return parsed.replace(tzinfo=ZoneInfo(param[5:].strip('"')))
+        # Floating time, as icalendar returns it
+        return parsed
 
     def get_google_events(self, service, time_min=None, time_max=None):
-        """Retrieve events from Google Calendar with caching"""
-        now = time.time()
-        # Use cache if less than 5 minutes old and no time constraints
-        if not time_min and not time_max and self._google_event_cache and self._google_cache_time and (now - self._google_cache_time) < 300:
-            return self._google_event_cache
-            
+        """Retrieve events from Google Calendar between time_min and time_max"""
+        # Each run asks for the window around its own events, so there is no time-based cache here
         try:
             calendar_id = self.get_calendar_id_by_name(service, CONFIG['GOOGLE_CALENDAR_NAME'])
             # Default to next 365 days if no time range specified
             if not time_min:
-                time_min = datetime.now(pytz.UTC) - timedelta(days=30)
+                time_min = datetime.now(UTC) - timedelta(days=30)
             if not time_max:
-                time_max = datetime.now(pytz.UTC) + timedelta(days=335)
-                
+                time_max = datetime.now(UTC) + timedelta(days=335)
+            
             events_result = service.events().list(
                 calendarId=calendar_id,
                 timeMin=time_min.isoformat(),
                 timeMax=time_max.isoformat(),
                 singleEvents=True,
                 orderBy='startTime'
-            ).execute()
-            
+            ).execute(num_retries=GOOGLE_API_RETRIES)
+        
             events = events_result.get('items', [])
             parsed_events = []
             for event in events:
                 try:
                     start = event['start'].get('dateTime', event['start'].get('date'))
                     end = event['end'].get('dateTime', event['end'].get('date'))
-                    
+                
                     # Parse datetime strings
                     if 'T' in start:
-                        start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
+                        start_dt = self.parse_iso(start)
                     else:
                         start_dt = datetime.fromisoformat(start).date()
-                        
+                    
                     if 'T' in end:
-                        end_dt = datetime.fromisoformat(end.replace('Z', '+00:00'))
+                        end_dt = self.parse_iso(end)
                     else:
                         end_dt = datetime.fromisoformat(end).date()
-                        
+                    
                     parsed_events.append({
                         'id': event.get('id'),
                         'summary': event.get('summary', ''),
@@ -392,21 +1166,24 @@ class EmailCalendarAutomator:
                         'raw': event
                     })
                 except Exception as e:
-                    logger.debug(f"Error parsing Google event: {e}")
+                    logger.debug("Error parsing Google event: %s", e)
                     continue
-                    
-            # Update cache only for full calendar fetch
-            if not time_min and not time_max:
-                self._google_event_cache = parsed_events
-                self._google_cache_time = now
+                
+            self._event_indexes['google'] = (parsed_events, self.build_event_index(parsed_events))
+            self._google_event_cache = parsed_events
             return parsed_events
         except Exception as e:
-            logger.error(f"Error retrieving Google events: {e}")
+            logger.error("Error retrieving Google events: %s", e)
             return []
-            
+        
     def is_event_duplicate(self, new_event_data, existing_events):
         """Check if event already exists in the list of existing events"""
-        for existing_event in existing_events:
+        return self.find_duplicate(new_event_data, existing_events) is not None
+
+    def find_duplicate(self, new_event_data, existing_events):
+        """Return the first existing event that duplicates the new event, or None"""
+        title_matcher, desc_matcher, _ = self.similarity_matchers(new_event_data)
+        for existing_event in self.overlap_candidates(new_event_data, existing_events):
             # Check time overlap first
             if not self.events_overlap(
                 new_event_data['start_date'], new_event_data['end_date'],
@@ -415,22 +1192,148 @@ class EmailCalendarAutomator:
                 continue
                 
             # Check content similarity
-            title_sim = self.calculate_similarity(new_event_data['title'], existing_event['summary'])
-            desc_sim = self.calculate_similarity(new_event_data['description'], existing_event['description'])
-            loc_sim = self.calculate_similarity(new_event_data['location'], existing_event['location'])
+            title_sim = self.matcher_similarity(title_matcher, existing_event['summary'], 0.9)
+            if title_sim <= 0.9:
+                continue
+            desc_sim = self.matcher_similarity(desc_matcher, existing_event['description'], 0.8)
             
             # If very high similarity, consider it a duplicate
-            if title_sim > 0.9 and desc_sim > 0.8:
-                return True
+            if desc_sim > 0.8:
+                return existing_event
                 
-        return False
-    def calculate_similarity(self, text1, text2):
-        """Calculate similarity ratio between two texts"""
-        if not text1 and not text2:
+        return None
+
+    def split_duplicates(self, event_datas, existing_events, calendar_label):
+        """Pick the batch events to create, returning (indexes to create, {duplicate index: earlier batch index or None})"""
+        to_create = []
+        duplicates = {}
+        # Events queued earlier in the batch are kept apart, so the indexed calendar list is never changed
+        queued = []
+        for index, event_data in enumerate(event_datas):
+            if self.is_event_duplicate(event_data, existing_events):
+                logger.info("Skipping duplicate %s event creation: %s", calendar_label, event_data['title'])
+                duplicates[index] = None
+                continue
+            earlier = self.find_duplicate(event_data, queued)
+            if earlier is not None:
+                logger.info("Skipping duplicate %s event creation within this batch: %s", calendar_label, event_data['title'])
+                duplicates[index] = earlier['position']
+                continue
+            to_create.append(index)
+            queued.append({
+                'summary': event_data['title'],
+                'start': event_data['start_date'],
+                'end': event_data['end_date'],
+                'location': event_data.get('location', ''),
+                'description': event_data.get('description', ''),
+                'position': index,
+            })
+        return to_create, duplicates
+
+    def resolve_duplicates(self, results, duplicates):
+        """Give skipped duplicates their outcome: success for calendar events, the earlier event's result otherwise"""
+        for index, earlier in duplicates.items():
+            results[index] = True if earlier is None else results[earlier]
+
+    def similarity_matchers(self, new_event):
+        """Build title, description and location matchers holding the new event's text"""
+        matchers = []
+        for field in ('title', 'description', 'location'):
+            text = new_event.get(field)
+            if fuzz is not None:
+                # rapidfuzz needs no prepared state, only the lowercased text
+                matchers.append(str(text).lower() if text else '')
+                continue
+            # Ratcliff-Obershelp is not symmetric, so the new event stays in seq1 as in a plain
+            # SequenceMatcher(None, new, existing) and each existing event is set as seq2
+            matcher = SequenceMatcher(None)
+            matcher.set_seq1(str(text).lower() if text else '')
+            matchers.append(matcher)
+        return matchers
+
+    def matcher_similarity(self, matcher, text, cutoff=0.0):
+        """Calculate similarity ratio between a matcher's prepared text and another text"""
+        # Below cutoff, a cheap upper bound (still below cutoff) is returned instead of the exact ratio
+        if fuzz is not None:
+            return fuzz.ratio(matcher, str(text).lower() if text else '', score_cutoff=cutoff * 100) / 100.0
+        if not matcher.a and not text:
             return 1.0
-        if not text1 or not text2:
+        if not matcher.a or not text:
             return 0.0
-        return SequenceMatcher(None, str(text1).lower(), str(text2).lower()).ratio()
+        matcher.set_seq2(str(text).lower())
+        # Length-only bound, then a character-multiset bound, before the full match
+        upper_bound = matcher.real_quick_ratio()
+        if upper_bound < cutoff:
+            return upper_bound
+        upper_bound = matcher.quick_ratio()
+        if upper_bound < cutoff:
+            return upper_bound
+        return matcher.ratio()
+
+    def similarity_upper_bound(self, matcher, text):
+        """Cheap upper bound of the difflib matcher_similarity, without the full match"""
+        if not matcher.a and not text:
+            return 1.0
+        if not matcher.a or not text:
+            return 0.0
+        matcher.set_seq2(str(text).lower())
+        return matcher.quick_ratio()
+
+    def event_day_span(self, start, end):
+        """Return the ordinal days an event touches, padded a day each side for time zone differences"""
+        start_day = start.date() if isinstance(start, datetime) else start
+        end_day = end.date() if isinstance(end, datetime) else end
+        return start_day.toordinal() - 1, end_day.toordinal() + 1
+
+    def build_event_index(self, events):
+        """Index events by their padded start day for overlap candidate lookups"""
+        keyed = []
+        unindexed = []
+        for position, event in enumerate(events):
+            try:
+                keyed.append((*self.event_day_span(event['start'], event['end']), position))
+            except Exception:
+                # Events without usable dates are always handed to the full overlap check
+                unindexed.append(position)
+        keyed.sort()
+        # Parallel arrays in start order, so lookups slice plain ints instead of walking event dicts
+        first_days = array('l', (first_day for first_day, _, _ in keyed))
+        last_days = array('l', (last_day for _, last_day, _ in keyed))
+        positions = array('l', (position for _, _, position in keyed))
+        max_span = max((last_day - first_day for first_day, last_day, _ in keyed), default=0)
+        return first_days, last_days, positions, max_span, unindexed
+
+    def overlap_candidates(self, new_event, events):
+        """Return the events that may overlap the new event, in their original order"""
+        index = None
+        for indexed_events, event_index in self._event_indexes.values():
+            if indexed_events is events:
+                index = event_index
+                break
+        if index is None:
+            return events
+        first_days, last_days, positions, max_span, unindexed = index
+        try:
+            first_day, last_day = self.event_day_span(new_event['start_date'], new_event['end_date'])
+        except Exception:
+            return events
+        # Only events starting within max_span days before the new event can reach it
+        lo = bisect_left(first_days, first_day - max_span)
+        hi = bisect_right(first_days, last_day)
+        matched = list(compress(positions[lo:hi], map(first_day.__le__, last_days[lo:hi])))
+        return [events[position] for position in sorted(matched + unindexed)]
+
+    def weighted_similarity(self, title_matcher, desc_matcher, loc_matcher, event, threshold):
+        """Weighted title/description/location similarity, stopping as soon as it cannot exceed threshold"""
+        # Each step assumes the fields not yet compared match perfectly, and gives up with 0.0 if even that falls short
+        title_sim = self.matcher_similarity(title_matcher, event['summary'], (threshold - 0.5) / 0.5)
+        if title_sim * 0.5 + 0.5 <= threshold:
+            return 0.0
+        desc_sim = self.matcher_similarity(desc_matcher, event['description'], (threshold - title_sim * 0.5 - 0.2) / 0.3)
+        if title_sim * 0.5 + desc_sim * 0.3 + 0.2 <= threshold:
+            return 0.0
+        loc_sim = self.matcher_similarity(loc_matcher, event['location'], (threshold - title_sim * 0.5 - desc_sim * 0.3) / 0.2)
+        return title_sim * 0.5 + desc_sim * 0.3 + loc_sim * 0.2
 
     def events_overlap(self, start1, end1, start2, end2):
         """Check if two time periods overlap"""
@@ -442,23 +1345,24 @@ class EmailCalendarAutomator:
         # Mixed datetime/date - convert date to datetime
         else:
             if isinstance(start1, date) and not isinstance(start1, datetime):
-                start1 = datetime.combine(start1, datetime.min.time()).replace(tzinfo=pytz.UTC)
+                start1 = datetime.combine(start1, datetime.min.time()).replace(tzinfo=UTC)
             if isinstance(end1, date) and not isinstance(end1, datetime):
-                end1 = datetime.combine(end1, datetime.max.time()).replace(tzinfo=pytz.UTC)
+                end1 = datetime.combine(end1, datetime.max.time()).replace(tzinfo=UTC)
             if isinstance(start2, date) and not isinstance(start2, datetime):
-                start2 = datetime.combine(start2, datetime.min.time()).replace(tzinfo=pytz.UTC)
+                start2 = datetime.combine(start2, datetime.min.time()).replace(tzinfo=UTC)
             if isinstance(end2, date) and not isinstance(end2, datetime):
-                end2 = datetime.combine(end2, datetime.max.time()).replace(tzinfo=pytz.UTC)
+                end2 = datetime.combine(end2, datetime.max.time()).replace(tzinfo=UTC)
             return max(start1, start2) < min(end1, end2)
 
     def find_similar_events(self, new_event, caldav_events=None, google_events=None):
         """Find events with >60% similarity in time and content (lowered threshold)"""
         similar_events = []
         threshold = 0.6  # Lowered threshold for better detection
+        title_matcher, desc_matcher, loc_matcher = self.similarity_matchers(new_event)
         
         # Check CalDAV events
         if CONFIG['ENABLE_CALDAV'] and caldav_events is not None:
-            for event in caldav_events:
+            for event in self.overlap_candidates(new_event, caldav_events):
                 # Skip if it's the same event we're comparing
                 if hasattr(new_event, 'get') and new_event.get('uid') == event.get('uid'):
                     continue
@@ -470,13 +1374,15 @@ class EmailCalendarAutomator:
                 ):
                     continue
                     
-                # Content similarity
-                title_sim = self.calculate_similarity(new_event['title'], event['summary'])
-                desc_sim = self.calculate_similarity(new_event['description'], event['description'])
-                loc_sim = self.calculate_similarity(new_event['location'], event['location'])
-                
-                # Weighted similarity (title is most important)
-                overall_sim = (title_sim * 0.5 + desc_sim * 0.3 + loc_sim * 0.2)
+                # Skip events whose best possible weighted score cannot pass the threshold;
+                # rapidfuzz scores the exact match about as fast, so the bound only pays off with difflib
+                if fuzz is None and (self.similarity_upper_bound(title_matcher, event['summary']) * 0.5
+                        + self.similarity_upper_bound(desc_matcher, event['description']) * 0.3
+                        + self.similarity_upper_bound(loc_matcher, event['location']) * 0.2) <= threshold:
+                    continue
+
+                # Content similarity, weighted (title is most important)
+                overall_sim = self.weighted_similarity(title_matcher, desc_matcher, loc_matcher, event, threshold)
                 if overall_sim > threshold:
                     similar_events.append({
                         'type': 'caldav',
@@ -486,7 +1392,7 @@ class EmailCalendarAutomator:
         
         # Check Google events
         if CONFIG['ENABLE_GOOGLE_CALENDAR'] and google_events is not None:
-            for event in google_events:
+            for event in self.overlap_candidates(new_event, google_events):
                 # Time overlap check
                 if not self.events_overlap(
                     new_event['start_date'], new_event['end_date'],
@@ -494,13 +1400,15 @@ class EmailCalendarAutomator:
                 ):
                     continue
                     
-                # Content similarity
-                title_sim = self.calculate_similarity(new_event['title'], event['summary'])
-                desc_sim = self.calculate_similarity(new_event['description'], event['description'])
-                loc_sim = self.calculate_similarity(new_event['location'], event['location'])
-                
-                # Weighted similarity
-                overall_sim = (title_sim * 0.5 + desc_sim * 0.3 + loc_sim * 0.2)
+                # Skip events whose best possible weighted score cannot pass the threshold;
+                # rapidfuzz scores the exact match about as fast, so the bound only pays off with difflib
+                if fuzz is None and (self.similarity_upper_bound(title_matcher, event['summary']) * 0.5
+                        + self.similarity_upper_bound(desc_matcher, event['description']) * 0.3
+                        + self.similarity_upper_bound(loc_matcher, event['location']) * 0.2) <= threshold:
+                    continue
+
+                # Content similarity, weighted
+                overall_sim = self.weighted_similarity(title_matcher, desc_matcher, loc_matcher, event, threshold)
                 if overall_sim > threshold:
                     similar_events.append({
                         'type': 'google',
@@ -516,390 +1424,865 @@ class EmailCalendarAutomator:
             # Get the actual event object from CalDAV, not just the parsed data
             event_obj = calendar.event_by_uid(old_event['uid'])
             if not event_obj:
-                logger.warning(f"Event with UID {old_event['uid']} not found in CalDAV calendar")
+                logger.warning("Event with UID %s not found in CalDAV calendar", old_event['uid'])
                 return False
     
             # Parse the current iCalendar data
             cal = Calendar.from_ical(event_obj.data)
             for component in cal.walk():
                 if component.name == "VEVENT":
-                    # Update fields
-                    component['summary'] = new_event_data['title']
+                    # Update fields; add() encodes values as iCalendar types, plain assignment would not
+                    component.pop('summary', None)
+                    component.add('summary', new_event_data['title'])
     
-                    # Handle datetime conversion
-                    start_dt = new_event_data['start_date']
-                    end_dt = new_event_data['end_date']
-                    if isinstance(start_dt, str):
-                        start_dt = datetime.fromisoformat(start_dt.replace('Z', '+00:00'))
-                    if isinstance(end_dt, str):
-                        end_dt = datetime.fromisoformat(end_dt.replace('Z', '+00:00'))
-
-                    # Ensure timezone awareness
-                    if start_dt.tzinfo is None:
-                        start_dt = pytz.UTC.localize(start_dt)
-                    if end_dt.tzinfo is None:
-                        end_dt = pytz.UTC.localize(end_dt)
-
-                    component['dtstart'] = start_dt
-                    component['dtend'] = end_dt
-
-                    if new_event_data.get('location'):
-                        component['location'] = new_event_data['location']
-                    if new_event_data.get('description'):
-                        component['description'] = new_event_data['description']
-
-                    # Update timestamps
-                    component['last-modified'] = datetime.now(pytz.UTC)
+                    # Dates were made aware datetimes by normalize_event_dates
+                    for field, value in (('dtstart', new_event_data['start_date']), ('dtend', new_event_data['end_date']),
+                                         ('location', new_event_data.get('location')),
+                                         ('description', new_event_data.get('description'))):
+                        if value:
+                            component.pop(field, None)
+                            component.add(field, value)
+
+                    # Update timestamps from a single clock read so they match
+                    now = datetime.now(UTC)
+                    for field in ('dtstamp', 'last-modified'):
+                        component.pop(field, None)
+                        component.add(field, now)
                     break
 
             # Serialize and save updated event using the existing event's save() method
             event_obj.data = cal.to_ical()
             event_obj.save()  # This does PUT and avoids no_overwrite issues
 
-            logger.info(f"Updated CalDAV event: {new_event_data['title']}")
+            logger.info("Updated CalDAV event: %s", new_event_data['title'])
             return True
         except Exception as e:
-            logger.error(f"Failed to update CalDAV event: {e}")
+            logger.error("Failed to update CalDAV event: %s", e)
         return False
 
+    def update_caldav_events(self, calendar, updates):
+        """Apply (old_event, new_event_data) updates one by one, returning a success flag per update"""
+        return [self.update_caldav_event(calendar, old_event, new_event_data) for old_event, new_event_data in updates]
+
     def update_google_event(self, service, old_event, new_event_data):
         """Update an existing Google Calendar event with new data"""
+        return self.update_google_events_batch(service, [(old_event, new_event_data)])[0]
+
+    def build_google_update_body(self, new_event_data):
+        """Build the Google Calendar API request body for an event update"""
+        # Prepare update body; the dates are aware datetimes from normalize_event_dates
+        event_body = {
+            'summary': new_event_data['title'],
+            'start': {
+                'dateTime': new_event_data['start_date'].isoformat(),
+                'timeZone': CONFIG['TIMEZONE'],
+            },
+            'end': {
+                'dateTime': new_event_data['end_date'].isoformat(),
+                'timeZone': CONFIG['TIMEZONE'],
+            },
+        }
+        
+        if new_event_data.get('location'):
+            event_body['location'] = new_event_data['location']
+        if new_event_data.get('description'):
+            event_body['description'] = new_event_data['description']
+        return event_body
+
+    def update_google_events_batch(self, service, updates):
+        """Apply (old_event, new_event_data) updates using batched requests, returning a success flag per update"""
+        results = [False] * len(updates)
         try:
             calendar_id = self.get_calendar_id_by_name(service, CONFIG['GOOGLE_CALENDAR_NAME'])
-            
-            # Handle datetime conversion
-            start_dt = new_event_data['start_date']
-            end_dt = new_event_data['end_date']
-            
-            if isinstance(start_dt, str):
-                start_dt = datetime.fromisoformat(start_dt.replace('Z', '+00:00'))
-            if isinstance(end_dt, str):
-                end_dt = datetime.fromisoformat(end_dt.replace('Z', '+00:00'))
-                
-            # Prepare update body
-            event_body = {
-                'summary': new_event_data['title'],
-                'start': {
-                    'dateTime': start_dt.isoformat() if isinstance(start_dt, datetime) else start_dt.isoformat(),
-                    'timeZone': CONFIG['TIMEZONE'],
-                },
-                'end': {
-                    'dateTime': end_dt.isoformat() if isinstance(end_dt, datetime) else end_dt.isoformat(),
-                    'timeZone': CONFIG['TIMEZONE'],
-                },
-            }
-            
-            if new_event_data.get('location'):
-                event_body['location'] = new_event_data['location']
-            if new_event_data.get('description'):
-                event_body['description'] = new_event_data['description']
-                
-            # Update the event
-            updated_event = service.events().update(
-                calendarId=calendar_id,
-                eventId=old_event['id'],
-                body=event_body
-            ).execute()
-            
-            logger.info(f"Updated Google Calendar event: {new_event_data['title']}")
-            return True
+            requests = [
+                (str(index), service.events().update(
+                    calendarId=calendar_id,
+                    eventId=old_event['id'],
+                    body=self.build_google_update_body(new_event_data)
+                ))
+                for index, (old_event, new_event_data) in enumerate(updates)
+            ]
+            for request_id, (_, exception) in self.execute_google_batch(service, requests).items():
+                title = updates[int(request_id)][1]['title']
+                if exception is not None:
+                    logger.error("Failed to update Google Calendar event '%s': %s", title, exception)
+                    continue
+                logger.info("Updated Google Calendar event: %s", title)
+                results[int(request_id)] = True
         except Exception as e:
-            logger.error(f"Failed to update Google Calendar event: {e}")
-            return False
+            logger.error("Failed to update Google Calendar events: %s", e)
+        return results
 
     def create_calendar_event(self, calendar, event_data):
         """Create calendar event in Radicale"""
+        return self.create_calendar_events_bulk(calendar, [event_data])[0]
+
+    def build_caldav_event(self, event_data, now=None):
+        """Build the iCalendar payload for a new event, stamped with now (the current time by default)"""
+        event = Event()
+        
+        # Add required properties
+        event.add('summary', event_data['title'])
+        
+        # Dates were made aware datetimes by normalize_event_dates
+        event.add('dtstart', event_data['start_date'])
+        event.add('dtend', event_data['end_date'])
+        
+        # Add optional properties
+        if event_data.get('location'):
+            event.add('location', event_data['location'])
+        if event_data.get('description'):
+            event.add('description', event_data['description'])
+        
+        # Add required timestamps
+        if now is None:
+            now = datetime.now(UTC)
+        event.add('dtstamp', now)
+        event.add('created', now)
+        event.add('last-modified', now)
+        
+        # Create unique UID and track it
+        event_uid = str(uuid.uuid4())
+        event.add('uid', event_uid)
+        self.remember_created_event(event_uid)
+        
+        # Wrap in the shared calendar header and footer
+        return _ICS_CALENDAR_HEAD + event.to_ical() + _ICS_CALENDAR_TAIL
+
+    def create_calendar_events_bulk(self, calendar, event_datas, caldav_events=None):
+        """Create events in Radicale with parallel PUTs, returning a success flag per event"""
+        results = [False] * len(event_datas)
         try:
-            # First, check if similar event already exists
-            caldav_events = self.get_caldav_events(calendar)
-            if self.is_event_duplicate(event_data, caldav_events):
-                logger.info(f"Skipping duplicate event creation: {event_data['title']}")
-                return True
+            if caldav_events is None:
+                caldav_events = self.get_caldav_events(calendar)
+            # First, check if similar events already exist, in the calendar or earlier in this batch
+            to_create, duplicates = self.split_duplicates(event_datas, caldav_events, 'CalDAV')
+            if not to_create:
+                self.resolve_duplicates(results, duplicates)
+                return results
+            # One timestamp for the whole batch
+            now = datetime.now(UTC)
 
-            cal = Calendar()
-            event = Event()
-            
-            # Add required properties
-            event.add('summary', event_data['title'])
-            
-            # Handle datetime objects
-            start_dt = event_data['start_date']
-            end_dt = event_data['end_date']
-            
-            if isinstance(start_dt, str):
-                start_dt = datetime.fromisoformat(start_dt.replace('Z', '+00:00'))
-            if isinstance(end_dt, str):
-                end_dt = datetime.fromisoformat(end_dt.replace('Z', '+00:00'))
-                
-            # Ensure timezone awareness
-            if start_dt.tzinfo is None:
-                start_dt = pytz.UTC.localize(start_dt)
-            if end_dt.tzinfo is None:
-                end_dt = pytz.UTC.localize(end_dt)
-                
-            event.add('dtstart', start_dt)
-            event.add('dtend', end_dt)
-            
-            # Add optional properties
-            if event_data.get('location'):
-                event.add('location', event_data['location'])
-            if event_data.get('description'):
-                event.add('description', event_data['description'])
-            
-            # Add required timestamps
-            now = datetime.now(pytz.UTC)
-            event.add('dtstamp', now)
-            event.add('created', now)
-            event.add('last-modified', now)
-            
-            # Create unique UID and track it
-            event_uid = str(uuid.uuid4())
-            event.add('uid', event_uid)
-            self.created_event_uids.add(event_uid)
-            
-            # Add to calendar
-            cal.add_component(event)
-            
-            # Save to CalDAV server
-            calendar.save_event(cal.to_ical())
-            logger.info(f"Created calendar event: {event_data['title']} at {start_dt}")
-            return True
+            def save(index):
+                event_data = event_datas[index]
+                try:
+                    # Save to CalDAV server; the client's HTTP session is shared across threads
+                    calendar.save_event(self.build_caldav_event(event_data, now))
+                    logger.info("Created calendar event: %s at %s", event_data['title'], event_data['start_date'])
+                    results[index] = True
+                except Exception as e:
+                    logger.error("Failed to create calendar event '%s': %s", event_data['title'], e)
+
+            with ThreadPoolExecutor(max_workers=CONFIG['CALDAV_CONCURRENCY']) as executor:
+                list(executor.map(save, to_create))
+            self.resolve_duplicates(results, duplicates)
         except Exception as e:
-            logger.error(f"Failed to create calendar event: {e}")
-            return False
+            logger.error("Failed to create calendar events: %s", e)
+        return results
 
     def process_emails(self, mail):
         """Process unread emails matching the subject pattern"""
+        self.run_async(self.aprocess_emails(mail))
+
+    async def aprocess_emails(self, mail):
+        """Process unread emails, running the blocking IMAP and calendar calls in worker threads"""
+        # UIDs to flag \Seen, stored in one command once the run is over
+        seen_uids = []
+        email_ids = []
+        message_ids = None
         try:
-            mail.select('inbox')
-            search_criteria = f'(UNSEEN SUBJECT "{CONFIG["SEARCH_SUBJECT"]}")'
-            status, messages = mail.search(None, search_criteria)
-            if status != 'OK':
-                logger.error("Failed to search emails")
+            email_ids = await asyncio.to_thread(self.search_new_emails, mail)
+            if not email_ids:
                 return
-            if not messages[0]:
-                logger.debug("No new matching emails found")
+            # Warm the calendar caches while the emails download; the two share nothing until matching
+            jobs = [asyncio.to_thread(self.collect_new_emails, mail, email_ids, seen_uids)]
+            if CONFIG['ENABLE_CALDAV'] and self.caldav_calendar:
+                jobs.append(asyncio.to_thread(self.get_caldav_events, self.caldav_calendar))
+            (pending, message_ids), *_ = await asyncio.gather(*jobs)
+            if pending and CONFIG['AI_SKIP_KNOWN_EVENTS']:
+                pending = await asyncio.to_thread(self.skip_known_events, pending, message_ids, seen_uids)
+            if not pending:
                 return
-                
-            email_ids = messages[0].split()
-            logger.info(f"Found {len(email_ids)} new matching emails")
+
+            # Parse all fetched emails with AI concurrently
+            results = await self._ai_batch(pending)
+            self.normalize_event_dates(results)
+
+            create_pending, caldav_events, google_events = await asyncio.to_thread(
+                self.apply_ai_results, pending, results, message_ids, seen_uids
+            )
+
+            # Create all queued events, writing to CalDAV and Google Calendar at the same time
+            if create_pending:
+                synced = await self._create_events(
+                    [event_data for _, _, _, event_data in create_pending], caldav_events, google_events
+                )
+                for (email_id, message_id, subject, _), success in zip(create_pending, synced):
+                    self.finish_synced_email(seen_uids, email_id, message_id, subject, success)
+            # Events were updated or created; the next run should see them
+            self.invalidate_event_caches()
+        except Exception as e:
+            logger.error("Error in process_emails: %s", e)
+        finally:
+            if seen_uids:
+                await asyncio.to_thread(self.store_seen, mail, seen_uids)
+            if message_ids is not None:
+                self.advance_last_uid(email_ids, message_ids)
+
+    def search_new_emails(self, mail):
+        """Return the UIDs of unread emails matching the subject pattern"""
+        mail.select('inbox')
+        # The UID watermark only means something while UIDVALIDITY is unchanged
+        _, data = mail.response('UIDVALIDITY')
+        uidvalidity = data[0].decode() if data and isinstance(data[0], bytes) else None
+        if uidvalidity != self._uidvalidity:
+            self._uidvalidity = uidvalidity
+            self._last_uid = 0
+            self.save_state('uidvalidity', uidvalidity)
+        search_criteria = self._search_criteria['X-GM-EXT-1' in mail.capabilities]
+        if self._last_uid:
+            # Emails already handled in an earlier run are left out by the server
+            search_criteria += f' UID {self._last_uid + 1}:*'
+        # UIDs stay valid even if other clients expunge messages mid-run
+        status, messages = mail.uid('SEARCH', f'({search_criteria})')
+        # SELECT always reports RECENT, and it is covered by this search; only later pushes mean new mail
+        self.drain_untagged_responses(mail)
+        if status != 'OK':
+            logger.error("Failed to search emails")
+            return []
+        # "n:*" always matches the highest UID, even when it is below n
+        email_ids = [uid for uid in (messages[0] or b'').split() if int(uid) > self._last_uid]
+        if not email_ids:
+            logger.debug("No new matching emails found")
+            return []
             
-            for email_id in email_ids:
-                email_id_str = email_id.decode() if isinstance(email_id, bytes) else email_id
-                if email_id_str in self.processed_emails:
-                    logger.debug(f"Skipping already processed email {email_id_str}")
+        logger.info("Found %s new matching emails", len(email_ids))
+        return email_ids
+
+    def imap_quote(self, value):
+        """Quote a string for an IMAP command, escaping backslashes and double quotes"""
+        return '"%s"' % value.replace('\\', '\\\\').replace('"', '\\"')
+
+    def advance_last_uid(self, email_ids, message_ids):
+        """Move the UID watermark past the searched emails, stopping before the first one left unfinished"""
+        processed = self.processed_message_ids(message_ids.values())
+        unfinished = []
+        for email_id in email_ids:
+            email_id_str = email_id.decode() if isinstance(email_id, bytes) else email_id
+            if message_ids.get(email_id_str) not in processed:
+                unfinished.append(int(email_id))
+        # Unfinished emails must stay in the next search so they get retried
+        last_uid = min(unfinished) - 1 if unfinished else max(int(email_id) for email_id in email_ids)
+        if last_uid != self._last_uid:
+            self._last_uid = last_uid
+            self.save_state('last_uid', str(last_uid))
+
+    def collect_new_emails(self, mail, email_ids, seen_uids):
+        """Fetch new emails, returning (email_id, subject, body, sender) tuples for the AI and their Message-IDs"""
+        ai_prefilter = CONFIG['AI_PREFILTER']
+        # Look up Message-IDs first so processed emails are never downloaded again
+        message_ids = self.fetch_message_ids(mail, email_ids)
+        processed = self.processed_message_ids(message_ids.values())
+        new_ids = []
+        batch_message_ids = set()
+        for email_id in email_ids:
+            email_id_str = email_id.decode() if isinstance(email_id, bytes) else email_id
+            if message_ids[email_id_str] in processed:
+                logger.debug("Skipping already processed email %s", email_id_str)
+                continue
+            # The same email can show up more than once, e.g. after being copied back into the inbox
+            if message_ids[email_id_str] in batch_message_ids:
+                logger.debug("Skipping duplicate of %s in this batch", message_ids[email_id_str])
+                continue
+            batch_message_ids.add(message_ids[email_id_str])
+            new_ids.append(email_id)
+        if not new_ids:
+            return [], message_ids
+
+        # First pass: fetch the headers and text part of every new email, leaving attachments on the server
+        raw_messages = self.fetch_text_messages(mail, new_ids)
+        pending = []
+        for email_id in new_ids:
+            email_id_str = email_id.decode() if isinstance(email_id, bytes) else email_id
+            if email_id_str not in raw_messages:
+                logger.error("Failed to fetch email %s", email_id_str)
+                continue
+            try:
+                # Parse headers only; the MIME tree is built once the email is worth it
+                msg = self._header_parser.parsebytes(raw_messages[email_id_str], headersonly=True)
+                # Get subject
+                subject = self.decode_header_value(msg.get('Subject', ''))
+                # Get sender
+                sender = self.decode_header_value(msg.get('From', ''))
+                logger.info("Processing email from %s: %s", sender, subject)
+                # Don't spend an AI call on emails that mention no date or time at all
+                if ai_prefilter and not self.may_have_date_hint(subject, msg):
+                    logger.info("No date hints found, skipping AI parsing: %s", subject)
+                    self.finish_unparsed_email(seen_uids, email_id, message_ids[email_id_str], subject)
                     continue
-                    
-                # Refresh cache for each email to get most recent events
-                caldav_events = self.get_caldav_events(self.caldav_calendar) if self.caldav_calendar else []
-                google_events = self.get_google_events(self.google_service) if self.google_service else []
-                
+                # Get body
+                body = self.get_email_body(email.message_from_bytes(raw_messages[email_id_str]))
+                if ai_prefilter and not _DATE_HINT_RE.search(subject + '\n' + body[:1000]):
+                    logger.info("No date hints found, skipping AI parsing: %s", subject)
+                    self.finish_unparsed_email(seen_uids, email_id, message_ids[email_id_str], subject)
+                    continue
+                pending.append((email_id, subject, body, sender))
+            except Exception as e:
+                logger.error("Error processing email %s: %s", email_id_str, e)
+        return pending, message_ids
+
+    def skip_known_events(self, pending, message_ids, seen_uids):
+        """Finish emails whose event is already in the cached calendars, returning the rest for the AI"""
+        # Only what is held already (CalDAV just warmed, Google from the previous run's window); nothing is fetched
+        events = (self._caldav_event_cache or []) + (self._google_event_cache or [])
+        if not events:
+            return pending
+        remaining = []
+        for email_id, subject, body, sender in pending:
+            email_id_str = email_id.decode() if isinstance(email_id, bytes) else email_id
+            match = self.quick_match(subject, body, events)
+            if match is None:
+                remaining.append((email_id, subject, body, sender))
+                continue
+            logger.info("Event already in calendar as '%s', skipping AI parsing: %s", match['summary'], subject)
+            self.mark_processed(message_ids[email_id_str])
+            if CONFIG['MARK_AS_PROCESSED']:
+                seen_uids.append(email_id)
+        return remaining
+
+    def quick_match(self, subject, body, events):
+        """Return a cached event on a date the email mentions whose title matches the subject, or None"""
+        dates = self.numeric_dates(subject + '\n' + body)
+        if not dates:
+            return None
+        subject_words = set(_WORD_RE.findall(subject.lower()))
+        prefix = CONFIG['EVENT_PREFIX']
+        for event in events:
+            start = event.get('start')
+            if start is None:
+                continue
+            if isinstance(start, datetime):
+                # Emails give dates in local time
+                start = (start.astimezone(self.timezone) if start.tzinfo else start).date()
+            if (start.month, start.day, None) not in dates and (start.month, start.day, start.year) not in dates:
+                continue
+            title = event.get('summary') or ''
+            if prefix and title.startswith(prefix):
+                title = title[len(prefix):]
+            title_words = _WORD_RE.findall(title.lower())
+            if not title_words:
+                continue
+            # Every word of the title appears in the subject
+            if set(title_words) <= subject_words:
+                return event
+        return None
+
+    def numeric_dates(self, text):
+        """Collect (month, day, year or None) for the numeric dates in a text, in both day/month orders"""
+        dates = set()
+        for iso_year, iso_month, iso_day, first, second, year in _NUMERIC_DATE_RE.findall(text):
+            if iso_year:
+                dates.add((int(iso_month), int(iso_day), int(iso_year)))
+                continue
+            year = (int(year) + 2000 if len(year) == 2 else int(year)) if year else None
+            for month, day in ((int(first), int(second)), (int(second), int(first))):
+                if 1 <= month <= 12 and 1 <= day <= 31:
+                    dates.add((month, day, year))
+        return dates
+
+    def parse_iso(self, value):
+        """Parse an ISO 8601 date-time to an aware datetime, taking naive values as UTC"""
+        dt = value
+        if isinstance(value, str):
+            dt = None
+            if parse_datetime is not None:
+                # ciso8601 reads the Z suffix itself and keeps its own fixed-offset cache
                 try:
-                    # Fetch email
-                    status, msg_data = mail.fetch(email_id, '(RFC822)')
-                    if status != 'OK':
-                        logger.error(f"Failed to fetch email {email_id_str}")
-                        continue
-                    # Parse email
-                    msg = email.message_from_bytes(msg_data[0][1])
-                    # Get message ID for tracking
-                    message_id = msg.get('Message-ID', email_id_str)
-                    # Get subject
-                    subject_raw = msg.get('Subject', '')
-                    subject = decode_header(subject_raw)[0][0]
-                    if isinstance(subject, bytes):
-                        subject = subject.decode('utf-8', errors='replace')
-                    # Get sender
-                    sender_raw = msg.get('From', '')
-                    sender = decode_header(sender_raw)[0][0]
-                    if isinstance(sender, bytes):
-                        sender = sender.decode('utf-8', errors='replace')
-                    # Get body
-                    body = self.get_email_body(msg)
-                    logger.info(f"Processing email from {sender}: {subject}")
-                    # Parse with AI
-                    event_data = self.parse_email_with_ai(subject, body, sender)
-                    if event_data:
-                        # Convert ISO strings to datetime objects for comparison
-                        try:
-                            start_dt = datetime.fromisoformat(event_data['start_date'].replace('Z', '+00:00'))
-                            end_dt = datetime.fromisoformat(event_data['end_date'].replace('Z', '+00:00'))
-                            event_data['start_date'] = start_dt
-                            event_data['end_date'] = end_dt
-                        except Exception as e:
-                            logger.error(f"Error parsing event dates: {e}")
+                    dt = parse_datetime(value)
+                except ValueError:
+                    pass
+            if dt is None:
+                dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if dt.tzinfo is None:
+            return dt.replace(tzinfo=UTC)
+        # Swap the fresh fixed-offset tzinfo for the shared one; named zones are left alone
+        if type(dt.tzinfo) is timezone:
+            offset = dt.utcoffset()
+            tz = _TZ_CACHE.get(offset)
+            if tz is None:
+                tz = _TZ_CACHE.setdefault(offset, timezone(offset))
+            if tz is not dt.tzinfo:
+                dt = dt.replace(tzinfo=tz)
+        return dt
+
+    def event_window(self, results, padding=timedelta(days=7)):
+        """Return (time_min, time_max) around every event in the AI results, or (None, None) if there are none"""
+        events = [event_data for event_data in results if isinstance(event_data, dict)]
+        if not events:
+            return None, None
+        return (min(event_data['start_date'] for event_data in events) - padding,
+                max(event_data['end_date'] for event_data in events) + padding)
+
+    def normalize_event_dates(self, results):
+        """Turn the ISO start and end of each parsed event into aware datetimes, in place"""
+        # Done once, so the matching and calendar writes downstream never re-parse
+        for index, event_data in enumerate(results):
+            if not isinstance(event_data, dict):
+                continue
+            try:
+                event_data['start_date'] = self.parse_iso(event_data['start_date'])
+                event_data['end_date'] = self.parse_iso(event_data['end_date'])
+            except Exception as e:
+                # Reported like any other failed email and left for the next run
+                results[index] = ValueError(f"Error parsing event dates: {e}")
+
+    def apply_ai_results(self, pending, results, message_ids, seen_uids):
+        """Update similar events for parsed emails, returning (events still to be created, CalDAV events, Google events)"""
+        # Settings used inside the per-email loop, bound once per run
+        caldav_calendar = self.caldav_calendar if CONFIG['ENABLE_CALDAV'] else None
+        google_service = self.google_service if CONFIG['ENABLE_GOOGLE_CALENDAR'] else None
+        mark_seen = CONFIG['MARK_AS_PROCESSED']
+        create_pending = []
+        caldav_updates = []
+        google_updates = []
+        # One refresh per run; the calendars are not expected to change between emails of a batch.
+        # Google is only asked for the days around this batch's events
+        time_min, time_max = self.event_window(results)
+        caldav_events = google_events = None
+        if time_min is not None:
+            caldav_events, google_events = self.refresh_all_caches(caldav_calendar, google_service, time_min, time_max)
+        for (email_id, subject, body, sender), event_data in zip(pending, results):
+            email_id_str = email_id.decode() if isinstance(email_id, bytes) else email_id
+            message_id = message_ids[email_id_str]
+
+            try:
+                if isinstance(event_data, Exception):
+                    raise event_data
+                if event_data:
+                    # Check for similar existing events
+                    similar_events = self.find_similar_events(
+                        event_data, 
+                        caldav_events,
+                        google_events
+                    )
+                    
+                    if similar_events:
+                        logger.info("Found %s similar existing events", len(similar_events))
+                        # Update the most similar event after the loop instead of creating a new one
+                        most_similar = similar_events[0]
+                        if most_similar['type'] == 'caldav' and caldav_calendar:
+                            caldav_updates.append((email_id, message_id, subject, most_similar['event'], event_data))
                             continue
-                            
-                        # Check for similar existing events
-                        similar_events = self.find_similar_events(
-                            event_data, 
-                            caldav_events if CONFIG['ENABLE_CALDAV'] else None,
-                            google_events if CONFIG['ENABLE_GOOGLE_CALENDAR'] else None
-                        )
-                        
-                        if similar_events:
-                            logger.info(f"Found {len(similar_events)} similar existing events")
-                            # Update the most similar event
-                            most_similar = similar_events[0]
-                            updated = False
-                            
-                            if most_similar['type'] == 'caldav' and CONFIG['ENABLE_CALDAV'] and self.caldav_calendar:
-                                updated = self.update_caldav_event(self.caldav_calendar, most_similar['event'], event_data)
-                            elif most_similar['type'] == 'google' and CONFIG['ENABLE_GOOGLE_CALENDAR'] and self.google_service:
-                                updated = self.update_google_event(self.google_service, most_similar['event'], event_data)
-                                
-                            if updated:
-                                logger.info(f"Updated existing event instead of creating new one: {event_data['title']}")
-                                self.processed_emails.add(email_id_str)
-                                if CONFIG['MARK_AS_PROCESSED']:
-                                    mail.store(email_id, '+FLAGS', '\\Seen')
-                                continue  # Skip creating new event
-                        
-                        success_caldav = False
-                        success_google = False
-                        # Create calendar event in CalDAV (if enabled and available)
-                        if CONFIG['ENABLE_CALDAV'] and self.caldav_calendar:
-                            success_caldav = self.create_calendar_event(self.caldav_calendar, event_data)
-                        elif CONFIG['ENABLE_CALDAV'] and not self.caldav_calendar:
-                            logger.warning("CalDAV calendar not available, skipping CalDAV event creation")
-                        elif not CONFIG['ENABLE_CALDAV']:
-                            logger.info("CalDAV is disabled, skipping CalDAV event creation")
-                        # Create calendar event in Google Calendar (if enabled and available)
-                        if CONFIG['ENABLE_GOOGLE_CALENDAR'] and self.google_service:
-                            try:
-                                success_google = self.create_google_event(self.google_service, event_data)
-                            except Exception as e:
-                                logger.error(f"Failed to create event in Google Calendar: {e}")
-                                success_google = False
-                        elif CONFIG['ENABLE_GOOGLE_CALENDAR'] and not self.google_service:
-                            logger.warning("Google Calendar not available, skipping Google event creation")
-                        elif not CONFIG['ENABLE_GOOGLE_CALENDAR']:
-                            logger.info("Google Calendar is disabled, skipping Google event creation")
-                        if success_caldav or success_google:
-                            logger.info(f"Successfully processed email and synced to available calendars: {subject}")
-                            self.processed_emails.add(email_id_str)
-                            if CONFIG['MARK_AS_PROCESSED']:
-                                mail.store(email_id, '+FLAGS', '\\Seen')
-                        else:
-                            logger.warning(f"Failed to sync event to any calendar for: {subject}")
-                            mail.store(email_id, '-FLAGS', '\\Seen')  # Keep unread
-                    else:
-                        logger.warning(f"Could not extract event from email: {subject}")
-                        # Keep as unread if configured to do so
-                        if not CONFIG['MARK_AS_PROCESSED']:
-                            mail.store(email_id, '-FLAGS', '\\Seen')
-                        else:
-                            # Mark as read but log that no event was found
-                            mail.store(email_id, '+FLAGS', '\\Seen')
-                            logger.info(f"Marked email as read despite no event data: {subject}")
-                            self.processed_emails.add(email_id_str)
-                except Exception as e:
-                    logger.error(f"Error processing email {email_id_str}: {e}")
-                    # Keep email as unread
-                    mail.store(email_id, '-FLAGS', '\\Seen')
+                        elif most_similar['type'] == 'google' and google_service:
+                            google_updates.append((email_id, message_id, subject, most_similar['event'], event_data))
+                            continue
+                    
+                    # Created in both calendars together after the loop
+                    create_pending.append((email_id, message_id, subject, event_data))
+                else:
+                    logger.warning("Could not extract event from email: %s", subject)
+                    self.finish_unparsed_email(seen_uids, email_id, message_id, subject)
+            except Exception as e:
+                logger.error("Error processing email %s: %s", email_id_str, e)
+
+        # The two servers share nothing, so CalDAV updates and the Google batch run side by side
+        executor = self.get_executor()
+        futures = []
+        if caldav_updates:
+            futures.append((caldav_updates, executor.submit(
+                self.update_caldav_events, caldav_calendar,
+                [(old_event, event_data) for _, _, _, old_event, event_data in caldav_updates]
+            )))
+        if google_updates:
+            futures.append((google_updates, executor.submit(
+                self.update_google_events_batch, google_service,
+                [(old_event, event_data) for _, _, _, old_event, event_data in google_updates]
+            )))
+        for updates, future in futures:
+            for (email_id, message_id, subject, _, event_data), success in zip(updates, future.result()):
+                if success:
+                    logger.info("Updated existing event instead of creating new one: %s", event_data['title'])
+                    self.mark_processed(message_id)
+                    if mark_seen:
+                        seen_uids.append(email_id)
+                else:
+                    # Fall back to creating the event, as when a single update fails
+                    create_pending.append((email_id, message_id, subject, event_data))
+        return create_pending, caldav_events, google_events
+
+    def store_seen(self, mail, email_ids):
+        """Mark several emails as read with a single UID STORE"""
+        try:
+            status, _ = mail.uid('STORE', self.uid_sequence(email_ids), '+FLAGS', '\\Seen')
+            if status != 'OK':
+                logger.error("Failed to mark %s emails as read", len(email_ids))
         except Exception as e:
-            logger.error(f"Error in process_emails: {e}")
+            logger.error("Failed to mark emails as read: %s", e)
+
+    def fetch_message_ids(self, mail, email_ids):
+        """Fetch the Message-ID header of several emails, keyed by UID"""
+        headers = self.fetch_messages(mail, email_ids, '(BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)])')
+        message_ids = {}
+        for email_id in email_ids:
+            email_id_str = email_id.decode() if isinstance(email_id, bytes) else email_id
+            message_id = email.message_from_bytes(headers.get(email_id_str, b'')).get('Message-ID')
+            # Fall back to the UID when the header is missing
+            message_ids[email_id_str] = message_id.strip() if message_id else email_id_str
+        return message_ids
+
+    def uid_sequence(self, email_ids):
+        """Build an IMAP UID set, collapsing consecutive UIDs into a:b ranges"""
+        uids = sorted({int(email_id) for email_id in email_ids})
+        ranges = []
+        start = previous = uids[0]
+        for uid in uids[1:]:
+            if uid != previous + 1:
+                ranges.append((start, previous))
+                start = uid
+            previous = uid
+        ranges.append((start, previous))
+        return ','.join(f'{first}:{last}' if first != last else str(first) for first, last in ranges).encode()
+
+    def fetch_messages(self, mail, email_ids, query='(BODY.PEEK[])'):
+        """Fetch several emails with one UID FETCH, returning raw messages keyed by UID"""
+        # BODY.PEEK[] does not set \Seen, so unprocessed emails stay unread
+        status, msg_data = mail.uid('FETCH', self.uid_sequence(email_ids), query)
+        if status != 'OK':
+            logger.error("Failed to fetch emails")
+            return {}
+        raw_messages = {}
+        for item in msg_data:
+            # Message payloads arrive as (b'<num> (UID <uid> BODY[] {<size>}', <raw bytes>) tuples
+            if isinstance(item, tuple):
+                match = _FETCH_UID_RE.search(item[0])
+                if match:
+                    raw_messages[match.group(1).decode()] = item[1]
+        return raw_messages
+
+    def decode_header_value(self, raw):
+        """Decode the first chunk of a header, as decode_header does"""
+        # Most headers carry no RFC 2047 encoded words, and decode_header would return them unchanged
+        if isinstance(raw, str) and '=?' not in raw:
+            return raw
+        value = decode_header(raw)[0][0]
+        if isinstance(value, bytes):
+            value = value.decode('utf-8', errors='replace')
+        return value
+
+    def fetch_text_messages(self, mail, email_ids):
+        """Fetch the headers and body text part of several emails, returning raw messages keyed by UID"""
+        # BODYSTRUCTURE says which section holds the text, so attachments are never downloaded
+        sections = {}
+        status, msg_data = mail.uid('FETCH', self.uid_sequence(email_ids), '(BODYSTRUCTURE)')
+        if status == 'OK':
+            for uid, response in self.split_fetch_responses(msg_data):
+                start = response.find(b'BODYSTRUCTURE')
+                if uid is None or start < 0:
+                    continue
+                try:
+                    part = self.find_text_part(self.parse_imap_list(response, start + len(b'BODYSTRUCTURE')))
+                except Exception as e:
+                    logger.debug("Could not read the structure of email %s: %s", uid, e)
+                    continue
+                if part is not None:
+                    sections[uid] = part
+        # Emails sharing a text section (usually all of them) are fetched together
+        by_section = {}
+        for uid, (section, _) in sections.items():
+            by_section.setdefault(section, []).append(uid)
+        raw_messages = {}
+        for section, uids in by_section.items():
+            status, msg_data = mail.uid('FETCH', self.uid_sequence(uids), f'(BODY.PEEK[HEADER] BODY.PEEK[{section}])')
+            if status != 'OK':
+                continue
+            for uid, items in self.split_fetch_literals(msg_data):
+                if uid in sections and 'HEADER' in items and section in items:
+                    # The text part's own content headers come first, so they win over the multipart ones
+                    raw_messages[uid] = sections[uid][1] + items['HEADER'] + items[section]
+        # Anything without a usable structure is fetched whole, as before
+        missing = [email_id for email_id in email_ids
+                   if (email_id.decode() if isinstance(email_id, bytes) else email_id) not in raw_messages]
+        if missing:
+            raw_messages.update(self.fetch_messages(mail, missing))
+        return raw_messages
+
+    def split_fetch_responses(self, msg_data):
+        """Join each message's FETCH response into one byte string, yielding (UID, response) pairs"""
+        response = None
+        for item in msg_data:
+            # Literals arrive as (prefix ending in {n}, data) tuples; rejoined they parse like inline strings
+            data = item[0] + item[1] if isinstance(item, tuple) else item
+            if not isinstance(data, bytes):
+                continue
+            if _FETCH_START_RE.match(data):
+                if response is not None:
+                    yield self.fetch_uid(response), response
+                response = data
+            elif response is not None:
+                response += data
+        if response is not None:
+            yield self.fetch_uid(response), response
+
+    def split_fetch_literals(self, msg_data):
+        """Group the BODY[...] literals of a FETCH response by message, yielding (UID, {section: data})"""
+        uid, items = None, {}
+        for item in msg_data:
+            prefix = item[0] if isinstance(item, tuple) else item
+            if not isinstance(prefix, bytes):
+                continue
+            if _FETCH_START_RE.match(prefix):
+                if items:
+                    yield uid, items
+                uid, items = None, {}
+            # The UID may come before or after the literals
+            if uid is None:
+                uid = self.fetch_uid(prefix)
+            if isinstance(item, tuple):
+                match = _FETCH_SECTION_RE.search(prefix)
+                if match:
+                    items[match.group(1).decode()] = item[1]
+        if items:
+            yield uid, items
+
+    def fetch_uid(self, response):
+        """Return the UID named in a FETCH response, or None"""
+        match = _FETCH_UID_RE.search(response)
+        return match.group(1).decode() if match else None
+
+    def parse_imap_list(self, data, pos=0):
+        """Parse the first parenthesized list at or after pos into nested lists of bytes, NIL as None"""
+        stack = [[]]
+        while pos < len(data):
+            match = _IMAP_TOKEN_RE.match(data, pos)
+            if not match:
+                break
+            pos = match.end()
+            opening, closing, quoted, literal, atom = match.groups()
+            if opening:
+                stack.append([])
+            elif closing:
+                if len(stack) == 1:
+                    break
+                done = stack.pop()
+                stack[-1].append(done)
+                if len(stack) == 1:
+                    return done
+            elif literal is not None:
+                stack[-1].append(data[pos:pos + int(literal)])
+                pos += int(literal)
+            elif quoted is not None:
+                stack[-1].append(_IMAP_QUOTED_RE.sub(rb'\1', quoted))
+            else:
+                stack[-1].append(None if atom.upper() == b'NIL' else atom)
+        raise ValueError("Unterminated IMAP list")
+
+    def find_text_part(self, structure):
+        """Pick the body text from a BODYSTRUCTURE, returning (section, content headers) or None"""
+        plain = html = None
+        # Depth-first over the parts, numbering sections the way IMAP does
+        stack = [(structure, '')]
+        while stack and plain is None:
+            body, section = stack.pop()
+            if isinstance(body[0], list):
+                children = list(takewhile(lambda child: isinstance(child, list), body))
+                prefix = section + '.' if section else ''
+                stack.extend((child, f'{prefix}{index}') for index, child in reversed(list(enumerate(children, 1))))
+                continue
+            if (body[0] or b'').lower() != b'text':
+                continue
+            # Text parts carry the disposition after their line count and MD5
+            disposition = body[9] if len(body) > 9 else None
+            if isinstance(disposition, list) and disposition and (disposition[0] or b'').lower() == b'attachment':
+                continue
+            subtype = (body[1] or b'').lower()
+            if subtype == b'plain' or (subtype == b'html' and html is None):
+                params = body[2] if isinstance(body[2], list) else []
+                charset = next((value for key, value in zip(params[::2], params[1::2])
+                                if (key or b'').lower() == b'charset' and value), None)
+                headers = b'Content-Type: text/' + subtype + (b'; charset="' + charset + b'"' if charset else b'')
+                headers += b'\r\nContent-Transfer-Encoding: ' + (body[5] or b'7bit') + b'\r\n'
+                part = (section or '1', headers)
+                if subtype == b'plain':
+                    plain = part
+                else:
+                    html = part
+        return plain or html
+
+    def finish_unparsed_email(self, seen_uids, email_id, message_id, subject):
+        """Flag an email that yielded no event"""
+        # Emails are fetched with BODY.PEEK[], so they stay unread unless queued here
+        if CONFIG['MARK_AS_PROCESSED']:
+            # Mark as read but log that no event was found
+            seen_uids.append(email_id)
+            logger.info("Marked email as read despite no event data: %s", subject)
+            self.mark_processed(message_id)
+
+    def finish_synced_email(self, seen_uids, email_id, message_id, subject, synced):
+        """Flag an email according to whether its event reached any calendar"""
+        if synced:
+            logger.info("Successfully processed email and synced to available calendars: %s", subject)
+            self.mark_processed(message_id)
+            if CONFIG['MARK_AS_PROCESSED']:
+                seen_uids.append(email_id)
+        else:
+            logger.warning("Failed to sync event to any calendar for: %s", subject)
 
     # Google Calendar Scopes
     GOOGLE_SCOPES = ['https://www.googleapis.com/auth/calendar']
 
     def authenticate_google(self):
         """Authenticate and return Google Calendar service object"""
+        # One service per automator, so its pooled HTTP connection is reused by every call
+        if self.google_service is not None:
+            return self.google_service
         creds = None
         token_file = CONFIG['GOOGLE_TOKEN_FILE']
         creds_file = CONFIG['GOOGLE_CREDENTIALS_FILE']
         if os.path.exists(token_file):
-            with open(token_file, 'rb') as token:
-                creds = pickle.load(token)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(creds_file, self.GOOGLE_SCOPES)
-                creds = flow.run_local_server(port=5353, open_browser=False)
-            with open(token_file, 'wb') as token:
-                pickle.dump(creds, token)
-        service = build('calendar', 'v3', credentials=creds)
+            try:
+                creds = Credentials.from_authorized_user_file(token_file, self.GOOGLE_SCOPES)
+            except (ValueError, UnicodeDecodeError) as e:
+                # Tokens written by older versions were pickled; authorize again instead of unpickling
+                logger.warning("Could not read Google token file, re-authorizing: %s", e)
+        # An expired access token is refreshed in memory by AuthorizedHttp on first use; the
+        # refresh token on disk does not change, so the file is only written after a new authorization
+        if not creds or not (creds.valid or creds.refresh_token):
+            flow = InstalledAppFlow.from_client_secrets_file(creds_file, self.GOOGLE_SCOPES)
+            creds = flow.run_local_server(port=5353, open_browser=False)
+            # Written to a temporary file and renamed, so a crash mid-write cannot corrupt the token
+            tmp_file = token_file + '.tmp'
+            with open(tmp_file, 'w') as token:
+                token.write(creds.to_json())
+            try:
+                os.replace(tmp_file, token_file)
+            except OSError:
+                # A file bind mount (as in compose.yaml) cannot be renamed over, so write it in place
+                os.remove(tmp_file)
+                with open(token_file, 'w') as token:
+                    token.write(creds.to_json())
+        # The default transport has no timeout, so a stalled connection could hang the loop
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=30))
+        # The discovery document bundled with the library is used, so building needs no request
+        service = build('calendar', 'v3', http=http, model=_OrjsonModel(), cache_discovery=False, static_discovery=True)
         logger.info("Authenticated with Google Calendar")
         return service
 
+    def get_calendar_list(self, service):
+        """Retrieve the Google calendar list with caching"""
+        now = time.monotonic()
+        # Use cache if less than 5 minutes old
+        if self._calendar_list_cache and self._calendar_list_cache_time and (now - self._calendar_list_cache_time) < 300:
+            return self._calendar_list_cache
+        # Only the names and IDs are ever read
+        calendar_list = service.calendarList().list(fields='items(id,summary)').execute(num_retries=GOOGLE_API_RETRIES)
+        self._calendar_list_cache = calendar_list
+        self._calendar_list_cache_time = now
+        return calendar_list
+
     def list_google_calendars(self, service):
         """List all Google Calendars to help with configuration"""
         try:
-            calendar_list = service.calendarList().list().execute()
+            calendar_list = self.get_calendar_list(service)
             for calendar_entry in calendar_list['items']:
-                logger.debug(f"Calendar ID: {calendar_entry['id']}, Summary: {calendar_entry['summary']}")
+                logger.debug("Calendar ID: %s, Summary: %s", calendar_entry['id'], calendar_entry['summary'])
         except Exception as e:
-            logger.error(f"Failed to list Google calendars: {e}")
+            logger.error("Failed to list Google calendars: %s", e)
 
     def get_calendar_id_by_name(self, service, calendar_name):
-        """Get Google Calendar ID by its display name"""
+        """Get Google Calendar ID by its display name (cached after first lookup)"""
+        if calendar_name in self._google_calendar_id_cache:
+            return self._google_calendar_id_cache[calendar_name]
         try:
-            calendar_list = service.calendarList().list().execute()
+            calendar_list = self.get_calendar_list(service)
+            # Cache every calendar from the listing so other names resolve without another call
             for calendar_entry in calendar_list['items']:
-                if calendar_entry['summary'] == calendar_name:
-                    return calendar_entry['id']
-            logger.warning(f"Calendar with name '{calendar_name}' not found. Using primary.")
+                self._google_calendar_id_cache.setdefault(calendar_entry['summary'], calendar_entry['id'])
+            if calendar_name in self._google_calendar_id_cache:
+                return self._google_calendar_id_cache[calendar_name]
+            logger.warning("Calendar with name '%s' not found. Using primary.", calendar_name)
+            self._google_calendar_id_cache[calendar_name] = 'primary'
             return 'primary'
         except Exception as e:
-            logger.error(f"Error fetching calendar ID: {e}")
+            logger.error("Error fetching calendar ID: %s", e)
             return 'primary'
 
+    def build_google_event_body(self, event_data):
+        """Build the Google Calendar API request body for an event"""
+        # The dates are aware datetimes from normalize_event_dates
+        event_body = {
+            'summary': event_data['title'],
+            'start': {
+                'dateTime': event_data['start_date'].isoformat(),
+                'timeZone': CONFIG['TIMEZONE'],
+            },
+            'end': {
+                'dateTime': event_data['end_date'].isoformat(),
+                'timeZone': CONFIG['TIMEZONE'],
+            },
+        }
+        
+        if event_data.get('location'):
+            event_body['location'] = event_data['location']
+        if event_data.get('description'):
+            event_body['description'] = event_data['description']
+        return event_body
+
     def create_google_event(self, service, event_data):
         """Create an event in Google Calendar"""
+        return self.create_google_events_batch(service, [event_data])[0]
+
+    def create_google_events_batch(self, service, event_datas, google_events=None):
+        """Create events in Google Calendar using batched requests, returning a success flag per event"""
+        results = [False] * len(event_datas)
         try:
-            # First, check if similar event already exists
-            time_min = event_data['start_date'] - timedelta(days=1)
-            time_max = event_data['end_date'] + timedelta(days=1)
-            google_events = self.get_google_events(service, time_min, time_max)
-            
-            if self.is_event_duplicate(event_data, google_events):
-                logger.info(f"Skipping duplicate Google event creation: {event_data['title']}")
-                return True
+            if google_events is None:
+                # One lookup covering the whole batch
+                time_min = min(ed['start_date'] for ed in event_datas) - timedelta(days=1)
+                time_max = max(ed['end_date'] for ed in event_datas) + timedelta(days=1)
+                google_events = self.get_google_events(service, time_min, time_max)
+            # First, check if similar events already exist
+
+            to_insert, duplicates = self.split_duplicates(event_datas, google_events, 'Google')
+            if not to_insert:
+                self.resolve_duplicates(results, duplicates)
+                return results
 
             calendar_id = self.get_calendar_id_by_name(service, CONFIG['GOOGLE_CALENDAR_NAME'])
-            
-            # Handle datetime objects
-            start_dt = event_data['start_date']
-            end_dt = event_data['end_date']
-            
-            if isinstance(start_dt, datetime):
-                start_iso = start_dt.isoformat()
-            else:
-                start_iso = start_dt
-            if isinstance(end_dt, datetime):
-                end_iso = end_dt.isoformat()
-            else:
-                end_iso = end_dt
-                
-            event_body = {
-                'summary': event_data['title'],
-                'start': {
-                    'dateTime': start_iso,
-                    'timeZone': CONFIG['TIMEZONE'],
-                },
-                'end': {
-                    'dateTime': end_iso,
-                    'timeZone': CONFIG['TIMEZONE'],
-                },
-            }
-            
-            if event_data.get('location'):
-                event_body['location'] = event_data['location']
-            if event_data.get('description'):
-                event_body['description'] = event_data['description']
-                
-            event = service.events().insert(calendarId=calendar_id, body=event_body).execute()
-            
-            # Track the event ID
-            if event.get('id'):
-                self.created_event_uids.add(event.get('id'))
-                
-            logger.info(f"Google Calendar event created: {event.get('htmlLink')} in calendar '{CONFIG['GOOGLE_CALENDAR_NAME']}'")
-            return True
+            requests = [
+                (str(index), service.events().insert(calendarId=calendar_id, body=self.build_google_event_body(event_datas[index])))
+                for index in to_insert
+            ]
+            for request_id, (event, exception) in self.execute_google_batch(service, requests).items():
+                index = int(request_id)
+                if exception is not None:
+                    logger.error("Failed to create Google Calendar event '%s': %s", event_datas[index]['title'], exception)
+                    continue
+                # Track the event ID
+                if event.get('id'):
+                    self.remember_created_event(event.get('id'))
+                logger.info("Google Calendar event created: %s in calendar '%s'", event.get('htmlLink'), CONFIG['GOOGLE_CALENDAR_NAME'])
+                results[index] = True
+            self.resolve_duplicates(results, duplicates)
         except Exception as e:
-            logger.error(f"Failed to create Google Calendar event: {e}")
-            return False
+            logger.error("Failed to create Google Calendar events: %s", e)
+        return results
+
+    def execute_google_batch(self, service, requests):
+        """Send (request_id, request) pairs in batch HTTP calls, returning {request_id: (response, exception)}"""
+        responses = {}
+
+        def on_response(request_id, response, exception):
+            responses[request_id] = (response, exception)
+
+        for chunk_start in range(0, len(requests), GOOGLE_BATCH_LIMIT):
+            batch = service.new_batch_http_request(callback=on_response)
+            for request_id, request in requests[chunk_start:chunk_start + GOOGLE_BATCH_LIMIT]:
+                batch.add(request, request_id=request_id)
+            try:
+                batch.execute()
+            except Exception as e:
+                logger.error("Failed to execute Google Calendar batch request: %s", e)
+        return responses
 
     def run_once(self, init_calendars=True):
         """Run the automation once"""
@@ -911,119 +2294,208 @@ class EmailCalendarAutomator:
             mail = self.connect_gmail()
             self.process_emails(mail)
         except Exception as e:
-            logger.error(f"Automation run failed: {e}")
+            logger.error("Automation run failed: %s", e)
         finally:
             if mail:
-                try:
-                    mail.logout()
-                except Exception as e:
-                    logger.warning(f"Error during mail logout: {e}")
+                self.disconnect_gmail(mail)
 
     def run_continuous(self):
-        """Run continuously checking for new emails"""
+        """Run continuously, waiting for new emails via IMAP IDLE"""
+        try:
+            self.run_async(self.arun_continuous())
+        except KeyboardInterrupt:
+            logger.info("Stopping automation due to keyboard interrupt...")
+            # Logging out also ends an IDLE still running in a worker thread
+            if self._mail is not None:
+                self.disconnect_gmail(self._mail)
+                self._mail = None
+
+    async def arun_continuous(self):
+        """Event loop side of run_continuous; blocking IMAP calls run in worker threads"""
         logger.info("Starting continuous email-to-calendar automation...")
         # Initialize calendars once at the start with early exit on failure
         try:
-            self.initialize_calendars()
+            await asyncio.to_thread(self.initialize_calendars)
         except Exception as e:
-            logger.error(f"Failed to initialize calendars at startup: {e}")
+            logger.error("Failed to initialize calendars at startup: %s", e)
             logger.critical("Cannot continue without calendar connections. Exiting.")
             sys.exit(1)
         consecutive_errors = 0
         max_consecutive_errors = 5
-        while True:
+        connected_at = 0
+        # SIGTERM (docker stop) and SIGINT let the batch in progress finish before exiting
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
             try:
-                self.run_once(init_calendars=False)  # Don't re-initialize calendars
-                consecutive_errors = 0
-                logger.debug(f"Sleeping for {CONFIG['CHECK_INTERVAL']} seconds...")
-                time.sleep(CONFIG['CHECK_INTERVAL'])
-            except KeyboardInterrupt:
-                logger.info("Stopping automation due to keyboard interrupt...")
-                break
+                loop.add_signal_handler(sig, self.request_stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        try:
+            while not self._stop.is_set():
+                try:
+                    if self._mail is None:
+                        self._mail = await asyncio.to_thread(self.connect_gmail)
+                        connected_at = time.monotonic()
+                        # Catch up on anything that arrived while disconnected
+                        await self.aprocess_emails(self._mail)
+                    consecutive_errors = 0
+                    # Reconnect periodically so a stale session never goes unnoticed
+                    remaining = CONFIG['IMAP_RECONNECT_INTERVAL'] - (time.monotonic() - connected_at)
+                    if remaining <= 0:
+                        logger.debug("Refreshing IMAP connection...")
+                        await asyncio.to_thread(self.disconnect_gmail, self._mail)
+                        self._mail = None
+                        continue
+                    if CONFIG['USE_IDLE'] and self.supports_idle(self._mail):
+                        logger.debug("Waiting for new emails via IMAP IDLE...")
+                        self._idling = True
+                        try:
+                            new_mail = await asyncio.to_thread(self.wait_for_new_mail, self._mail, min(CONFIG['IDLE_TIMEOUT'], remaining))
+                        finally:
+                            self._idling = False
+                    else:
+                        # IDLE is turned off or the server cannot push new mail, so check on a fixed interval instead
+                        logger.debug("Checking for new emails again in %s seconds...", CONFIG['CHECK_INTERVAL'])
+                        await self.sleep_unless_stopped(min(CONFIG['CHECK_INTERVAL'], remaining))
+                        new_mail = True
+                    if new_mail and not self._stop.is_set():
+                        await self.aprocess_emails(self._mail)
+                except Exception as e:
+                    if self._mail is not None:
+                        await asyncio.to_thread(self.disconnect_gmail, self._mail)
+                        self._mail = None
+                    consecutive_errors += 1
+                    # Double the wait after each failure, with jitter so restarts don't line up
+                    retry_interval = min(CONFIG['RETRY_INTERVAL'] * 2 ** (consecutive_errors - 1), CONFIG['RETRY_MAX_INTERVAL'])
+                    retry_interval += random.uniform(0, retry_interval * 0.1)
+                    logger.error("Continuous run error: %s", e)
+                    logger.warning("Consecutive errors: %s/%s", consecutive_errors, max_consecutive_errors)
+                    if consecutive_errors >= max_consecutive_errors:
+                        logger.critical("Too many consecutive errors (%s). Stopping service.", consecutive_errors)
+                        break
+                    logger.info("Retrying in %.0f seconds...", retry_interval)
+                    await self.sleep_unless_stopped(retry_interval)
+        finally:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                try:
+                    loop.remove_signal_handler(sig)
+                except (NotImplementedError, RuntimeError):
+                    pass
+            if self._mail is not None:
+                self.disconnect_gmail(self._mail)
+                self._mail = None
+        logger.info("Continuous automation stopped")
+
+    def request_stop(self):
+        """Ask run_continuous to stop once the batch in progress is done"""
+        if self._stop.is_set():
+            return
+        logger.info("Shutdown requested, stopping after the current batch...")
+        self._stop.set()
+        if self._idling and self._mail is not None:
+            # Any other command ends an IDLE waiting in a worker thread
+            asyncio.get_running_loop().run_in_executor(None, self._mail.noop)
+
+    async def sleep_unless_stopped(self, seconds):
+        """Sleep for up to the given seconds, waking early when a stop is requested"""
+        try:
+            await asyncio.wait_for(self._stop.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+def check_gmail(automator):
+    """Preflight check: log in to Gmail and out again"""
+    try:
+        logger.info("Testing Gmail connection...")
+        mail = automator.connect_gmail()
+        mail.logout()
+        logger.info("✓ Gmail connection successful")
+        return True
+    except Exception as e:
+        logger.critical("✗ Failed to connect to Gmail: %s", e)
+        return False
+
+def check_caldav(automator):
+    """Preflight check: list the CalDAV calendars, retrying as configured"""
+    try:
+        logger.info("Testing CalDAV connection...")
+        for attempt in range(CONFIG['CALDAV_RETRY_ATTEMPTS']):
+            try:
+                # Kept on the automator so the run reuses this connection instead of opening another
+                automator.caldav_calendar = automator.connect_caldav()
+                logger.info("✓ CalDAV connection successful (calendar '%s')", CONFIG['CALENDAR_NAME'])
+                return True
             except Exception as e:
-                consecutive_errors += 1
-                retry_interval = CONFIG['RETRY_INTERVAL'] * min(consecutive_errors, 5)
-                logger.error(f"Continuous run error: {e}")
-                logger.warning(f"Consecutive errors: {consecutive_errors}/{max_consecutive_errors}")
-                if consecutive_errors >= max_consecutive_errors:
-                    logger.critical(f"Too many consecutive errors ({consecutive_errors}). Stopping service.")
-                    break
-                logger.info(f"Retrying in {retry_interval} seconds...")
-                time.sleep(retry_interval)
+                logger.warning("CalDAV connection attempt %s/%s failed: %s", attempt + 1, CONFIG['CALDAV_RETRY_ATTEMPTS'], e)
+                if attempt < CONFIG['CALDAV_RETRY_ATTEMPTS'] - 1:
+                    logger.info("Retrying CalDAV connection in %s seconds...", CONFIG['CALDAV_RETRY_DELAY'])
+                    time.sleep(CONFIG['CALDAV_RETRY_DELAY'])
+        logger.critical("✗ All CalDAV connection attempts failed")
+        return False
+    except Exception as e:
+        logger.critical("✗ Failed to connect to CalDAV: %s", e)
+        return False
+
+def check_google_calendar(automator):
+    """Preflight check: authenticate with Google and list the calendars"""
+    try:
+        logger.info("Testing Google Calendar connection...")
+        automator.google_service = automator.authenticate_google()
+        calendar_list = automator.get_calendar_list(automator.google_service)
+        logger.info("✓ Google Calendar connection successful (found %s calendars)", len(calendar_list['items']))
+        return True
+    except Exception as e:
+        logger.critical("✗ Failed to connect to Google Calendar: %s", e)
+        return False
 
 def main():
     """Main entry point - Check connections at startup based on configuration"""
     try:
         logger.info("Email-to-Calendar Automation starting up...")
-        logger.info("Checking connections at startup based on configuration...")
-        # Test Gmail connection
+        # Use uvloop for the automator's event loop when it is installed
         try:
-            logger.info("Testing Gmail connection...")
-            automator = EmailCalendarAutomator()
-            mail = automator.connect_gmail()
-            mail.logout()
-            logger.info("✓ Gmail connection successful")
-        except Exception as e:
-            logger.critical(f"✗ Failed to connect to Gmail: {e}")
-            return 1
-        # Test CalDAV connection if enabled
-        if CONFIG['ENABLE_CALDAV']:
-            try:
-                logger.info("Testing CalDAV connection...")
-                caldav_success = False
-                for attempt in range(CONFIG['CALDAV_RETRY_ATTEMPTS']):
-                    try:
-                        client = DAVClient(
-                            url=CONFIG['CALDAV_URL'],
-                            username=CONFIG['CALDAV_USERNAME'],
-                            password=CONFIG['CALDAV_PASSWORD']
-                        )
-                        principal = client.principal()
-                        calendars = principal.calendars()
-                        logger.info(f"✓ CalDAV connection successful (found {len(calendars)} calendars)")
-                        caldav_success = True
-                        break
-                    except Exception as e:
-                        logger.warning(f"CalDAV connection attempt {attempt + 1}/{CONFIG['CALDAV_RETRY_ATTEMPTS']} failed: {e}")
-                        if attempt < CONFIG['CALDAV_RETRY_ATTEMPTS'] - 1:
-                            logger.info(f"Retrying CalDAV connection in {CONFIG['CALDAV_RETRY_DELAY']} seconds...")
-                            time.sleep(CONFIG['CALDAV_RETRY_DELAY'])
-                        else:
-                            logger.critical(f"✗ All CalDAV connection attempts failed")
-                            return 1
-            except Exception as e:
-                logger.critical(f"✗ Failed to connect to CalDAV: {e}")
-                return 1
-        else:
-            logger.info("CalDAV is disabled via ENABLE_CALDAV=false")
-        # Test Google Calendar connection if enabled
-        if CONFIG['ENABLE_GOOGLE_CALENDAR']:
-            try:
-                logger.info("Testing Google Calendar connection...")
-                automator = EmailCalendarAutomator()
-                service = automator.authenticate_google()
-                calendar_list = service.calendarList().list().execute()
-                logger.info(f"✓ Google Calendar connection successful (found {len(calendar_list['items'])} calendars)")
-            except Exception as e:
-                logger.critical(f"✗ Failed to connect to Google Calendar: {e}")
-                return 1
-        else:
-            logger.info("Google Calendar is disabled via ENABLE_GOOGLE_CALENDAR=false")
-        logger.info("All enabled connections successful! Starting automation...")
-        # Start the automation
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            logger.info("Using uvloop event loop")
+        except ImportError:
+            pass
+        logger.info("Checking connections at startup based on configuration...")
+        # The same automator runs the checks and the automation, so connections made here are reused
         automator = EmailCalendarAutomator()
-        # Run once or continuously based on environment variable
-        if os.getenv('RUN_ONCE', '').lower() == 'true':
-            logger.info("Running in one-time mode")
-            automator.run_once()
-        else:
-            logger.info("Running in continuous mode")
-            automator.run_continuous()
+        try:
+            checks = [check_gmail]
+            if CONFIG['ENABLE_CALDAV']:
+                checks.append(check_caldav)
+            else:
+                logger.info("CalDAV is disabled via ENABLE_CALDAV=false")
+            if CONFIG['ENABLE_GOOGLE_CALENDAR']:
+                checks.append(check_google_calendar)
+            else:
+                logger.info("Google Calendar is disabled via ENABLE_GOOGLE_CALENDAR=false")
+            # Run the checks side by side and stop at the first failure. Daemon threads, so a check
+            # still retrying or waiting for OAuth cannot keep the process from exiting afterwards
+            outcomes = queue.Queue()
+            for check in checks:
+                threading.Thread(target=lambda check=check: outcomes.put(check(automator)), daemon=True).start()
+            for _ in checks:
+                if not outcomes.get():
+                    return 1
+            logger.info("All enabled connections successful! Starting automation...")
+            # Start the automation
+            # Run once or continuously based on environment variable
+            if CONFIG['RUN_ONCE']:
+                logger.info("Running in one-time mode")
+                automator.run_once()
+            else:
+                logger.info("Running in continuous mode")
+                automator.run_continuous()
+        finally:
+            automator.close()
     except Exception as e:
-        logger.critical(f"Fatal error in main: {e}")
+        logger.critical("Fatal error in main: %s", e)
         return 1
     return 0
 
 if __name__ == "__main__":
-    exit_code = main()
-    exit(exit_code)
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from difflib import SequenceMatcher
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mail2cal
+
+
+class StubIMAP:
+    """Minimal imaplib2 connection: untagged replies queue up until something reads them"""
+    capabilities = ('IMAP4REV1', 'IDLE')
+
+    def __init__(self, pushed_during_idle=()):
+        self.commands_lock = threading.Lock()
+        self.untagged_responses = []
+        self.pushed_during_idle = list(pushed_during_idle)
+        self.commands = []
+
+    def select(self, mailbox):
+        self.commands.append('SELECT')
+        # imaplib2 pops EXISTS for the return value and leaves the rest queued
+        self.untagged_responses += [('FLAGS', [b'(\\Seen)']), ('RECENT', [b'0']), ('UIDVALIDITY', [b'7'])]
+        return 'OK', [b'3']
+
+    def response(self, name):
+        data = [dat for typ, dat in self.untagged_responses if typ == name]
+        self.untagged_responses = [(typ, dat) for typ, dat in self.untagged_responses if typ != name]
+        return name, data[0] if data else [None]
+
+    def uid(self, command, *args):
+        self.commands.append('UID ' + command)
+        return 'OK', [b'']
+
+    def idle(self, timeout=None):
+        self.commands.append('IDLE')
+        self.untagged_responses += self.pushed_during_idle
+
+
+class AutomatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        db = os.path.join(self.tmpdir.name, 'state.db')
+        patcher = mock.patch.dict(mail2cal.CONFIG, {'PROCESSED_EMAILS_DB': db})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.automator = mail2cal.EmailCalendarAutomator()
+
+    def tearDown(self):
+        self.automator.close()
+        self.tmpdir.cleanup()
+
+
+class WaitForNewMailTest(AutomatorTestCase):
+    def test_select_replies_do_not_skip_idle(self):
+        mail = StubIMAP()
+        self.automator.search_new_emails(mail)
+        self.assertFalse(self.automator.wait_for_new_mail(mail, 1))
+        self.assertEqual(mail.commands, ['SELECT', 'UID SEARCH', 'IDLE'])
+
+    def test_exists_pushed_during_idle(self):
+        mail = StubIMAP(pushed_during_idle=[('EXISTS', [b'4']), ('RECENT', [b'1'])])
+        self.automator.search_new_emails(mail)
+        self.assertTrue(self.automator.wait_for_new_mail(mail, 1))
+        self.assertEqual(mail.untagged_responses, [])
+
+    def test_exists_queued_after_search_returns_at_once(self):
+        mail = StubIMAP()
+        self.automator.search_new_emails(mail)
+        # Announced alongside a FETCH or STORE reply while the batch was processed
+        mail.untagged_responses.append(('EXISTS', [b'4']))
+        self.assertTrue(self.automator.wait_for_new_mail(mail, 1))
+        self.assertNotIn('IDLE', mail.commands)
+
+
+
+class CloseTest(AutomatorTestCase):
+    def test_leftover_tasks_clean_up_before_the_store_closes(self):
+        cleaned_up = []
+
+        async def interrupted_run():
+            try:
+                await asyncio.sleep(60)
+            finally:
+                cleaned_up.append(self.automator.processed_message_ids(['<a@example.com>']))
+
+        async def start():
+            asyncio.get_running_loop().create_task(interrupted_run())
+            await asyncio.sleep(0)
+
+        self.automator.run_async(start())
+        self.automator.close()
+        self.assertEqual(cleaned_up, [set()])
+
+
+def baseline_similarity(text1, text2):
+    """calculate_similarity as it was before the prepared matchers"""
+    if not text1 and not text2:
+        return 1.0
+    if not text1 or not text2:
+        return 0.0
+    return SequenceMatcher(None, str(text1).lower(), str(text2).lower()).ratio()
+
+
+def random_text(rng):
+    words = ['team', 'sync', 'meeting', 'weekly', 'review', 'room', 'a', 'b', 'lunch', 'call', 'zoom', 'standup']
+    return ' '.join(rng.choice(words) for _ in range(rng.randint(0, 6)))
+
+
+class DifflibSimilarityTest(AutomatorTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(mail2cal, 'fuzz', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_find_similar_events_matches_baseline(self):
+        rng = random.Random(0)
+        start = datetime(2026, 3, 5, 10, tzinfo=timezone.utc)
+        with mock.patch.dict(mail2cal.CONFIG, {'ENABLE_CALDAV': True, 'ENABLE_GOOGLE_CALENDAR': False}):
+            for _ in range(300):
+                new_event = {'title': random_text(rng), 'description': random_text(rng), 'location': random_text(rng),
+                             'start_date': start, 'end_date': start + timedelta(hours=1)}
+                events = [{'uid': str(i), 'summary': random_text(rng), 'description': random_text(rng),
+                           'location': random_text(rng), 'start': start, 'end': start + timedelta(hours=1)}
+                          for i in range(5)]
+                expected = {}
+                for event in events:
+                    score = (baseline_similarity(new_event['title'], event['summary']) * 0.5
+                             + baseline_similarity(new_event['description'], event['description']) * 0.3
+                             + baseline_similarity(new_event['location'], event['location']) * 0.2)
+                    if score > 0.6:
+                        expected[event['uid']] = score
+                found = {match['event']['uid']: match['similarity']
+                         for match in self.automator.find_similar_events(new_event, caldav_events=events)}
+                self.assertEqual(found.keys(), expected.keys())
+                for uid, score in expected.items():
+                    self.assertAlmostEqual(found[uid], score)
+
+    def test_gated_similarity_matches_plain_ratio(self):
+        rng = random.Random(1)
+        cutoffs = [step / 20 for step in range(21)]
+        for _ in range(300):
+            new_text, existing_text = random_text(rng), random_text(rng)
+            plain = baseline_similarity(new_text, existing_text)
+            for cutoff in cutoffs:
+                matcher = self.automator.similarity_matchers({'title': new_text})[0]
+                gated = self.automator.matcher_similarity(matcher, existing_text, cutoff)
+                if plain >= cutoff:
+                    self.assertAlmostEqual(gated, plain)
+                else:
+                    # Below the cutoff only an upper bound is promised
+                    self.assertLess(gated, cutoff)
+                    self.assertGreaterEqual(gated, plain)
+
+
+if __name__ == '__main__':
+    unittest.main()